@@ -5,12 +5,9 @@
 # - Ordem manual por lote (st.data_editor) + botão para aplicar prefixos
 
 import os
-import io
 import re
 import sys
 import shutil
-import zipfile
-import subprocess
 from pathlib import Path
 from typing import List
 import re
@@ -19,13 +16,19 @@ import shutil
 
 import streamlit as st
 import pandas as pd
-from PIL import Image
+
+from package.JobService import JobService, JobRequest
+from package.ThumbnailCache import ThumbnailCache
+from package.OutputArchive import ArchiveCache
+from package.UploadIngestor import UploadIngestor
+from package.LoteCatalog import LoteCatalog
+from package.Config import ChainConfig, EnvConfig, MappingConfig, SecretsFileConfig, set_config_provider
 
 # Config & paths
 
 PREFIX_RE = re.compile(r"^\d+_")
-NAT_RE = re.compile(r"\d+|\D+")
 MAX_PAGES_PER_RUN = 10  # limite máximo
+THUMBS_PER_PAGE = 24    # miniaturas por página na grade de "Gerenciar lotes"
 
 
 
@@ -56,122 +59,170 @@ def ensure_lote_dir(lote: str) -> Path:
     p.mkdir(parents=True, exist_ok=True)
     return p
 
-def list_lotes() -> List[str]:
-    return sorted([p.name for p in IMAGES_DIR.iterdir() if p.is_dir()])
-
+# Catálogo SQLite (cache/catalog/): listagens são consultas; a pasta só é relida quando muda
+@st.cache_resource
+def get_catalog() -> LoteCatalog:
+    return LoteCatalog(IMAGES_DIR, output_dir=OUTPUT_DIR)
 
-def _natural_key(name: str):
-    parts = NAT_RE.findall(name)
-    key = []
-    for p in parts:
-        if p.isdigit():
-            key.append((0, int(p)))
-        else:
-            key.append((1, p.lower()))
-    return key
+def list_lotes() -> List[str]:
+    return get_catalog().lotes()
 
 def list_images(lote: str) -> List[Path]:
-    p = IMAGES_DIR / lote
-    if not p.exists():
-        return []
-    imgs = [f for f in p.iterdir() if f.is_file() and f.suffix.lower() in {".png", ".jpg", ".jpeg"}]
-    imgs = [f for f in imgs if not f.name.startswith("__tmp__")]
-    return sorted(imgs, key=lambda f: _natural_key(f.name))
+    # ordem natural do nome (001_..., 2 antes de 10)
+    return get_catalog().pages(lote, "name", extensions={".png", ".jpg", ".jpeg"})
+
+@st.cache_resource
+def get_ingestor() -> UploadIngestor:
+    return UploadIngestor(IMAGES_DIR)
 
 def save_uploads(lote: str, files):
+    """Grava em paralelo (pool de processos) com barra de progresso; conteúdo repetido não é regravado."""
     dest = ensure_lote_dir(lote)
-    saved = 0
+    uploads = []
     for f in files:
-        try:
-            size_ok = getattr(f, "size", None)
-            if size_ok is not None and size_ok > MAX_FILE_MB * 1024 * 1024:
-                st.warning(f"'{f.name}' ignorado: excede {MAX_FILE_MB} MB.")
-                continue
-            img = Image.open(f).convert("RGB")
-            out_name = Path(f.name).with_suffix(".jpg").name  # normaliza extensão
-            img.save(dest / out_name, format="JPEG", quality=95)
-            saved += 1
-        except Exception as e:
-            st.error(f"Falha ao processar '{getattr(f, 'name', 'arquivo')}': {e}")
-    return saved
+        size_ok = getattr(f, "size", None)
+        if size_ok is not None and size_ok > MAX_FILE_MB * 1024 * 1024:
+            st.warning(f"'{f.name}' ignorado: excede {MAX_FILE_MB} MB.")
+            continue
+        uploads.append((f.name, f.getvalue()))
+    if not uploads:
+        return 0
+
+    bar = st.progress(0.0, text=f"Gravando 0/{len(uploads)}…")
+    def on_progress(done: int, total: int, name: str):
+        bar.progress(done / total, text=f"Gravando {done}/{total}: {name}")
+
+    results = get_ingestor().ingest(dest, uploads, on_progress=on_progress)
+    bar.empty()
+    get_catalog().sync_lote(lote, force=True)
+    duplicates = [r for r in results if r["status"] == "duplicate"]
+    linked = [r for r in results if r["status"] == "linked"]
+    for r in results:
+        if r["status"] == "failed":
+            st.error(f"Falha ao processar '{r['source']}': {r['error']}")
+    if duplicates:
+        st.info(f"{len(duplicates)} arquivo(s) ignorado(s): conteúdo já presente no lote.")
+    if linked:
+        st.info(f"{len(linked)} arquivo(s) já enviados a outro lote: reaproveitados sem recodificar.")
+    renamed = [r for r in results if r["status"] in ("saved", "linked")
+               and r["name"] != Path(r["source"]).with_suffix(".jpg").name]
+    if renamed:
+        st.info("Nomes já usados no lote, gravados como: " + ", ".join(f"{r['source']} → {r['name']}" for r in renamed))
+    return sum(1 for r in results if r["status"] in ("saved", "linked"))
+
+# Miniaturas da grade: geradas 1x por imagem (em segundo plano), servidas do cache
+@st.cache_resource
+def get_thumbnails() -> ThumbnailCache:
+    return ThumbnailCache()
 
 # Output (flat em ./output)
 def list_outputs_for_lote(lote: str) -> List[Path]:
-    if not OUTPUT_DIR.exists():
-        return []
-    # Heurística: arquivos de saída que CONTÊM o nome do lote
-    return sorted([p for p in OUTPUT_DIR.iterdir() if p.is_file() and lote.lower() in p.name.lower()])
-
-def zip_outputs(files: List[Path]) -> bytes:
-    mem = io.BytesIO()
-    with zipfile.ZipFile(mem, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for p in files:
-            zf.write(p, arcname=p.name)
-    mem.seek(0)
-    return mem.read()
-
-# Execução do main.py com logs
-def run_main(lote: str, mode_label: str, lang_label: str) -> int:
+    # saídas registradas pelo pipeline para o lote (sem casar nomes por substring)
+    return get_catalog().outputs(lote)
+
+# ZIPs em cache/zips/, gravados em disco e reaproveitados até alguma saída mudar (mtime)
+@st.cache_resource
+def get_archives() -> ArchiveCache:
+    return ArchiveCache()
+
+# Execução do pipeline: serviço de jobs em processo (clientes quentes, compartilhado entre sessões)
+# credenciais: ambiente, depois st.secrets (inclui ~/.streamlit/secrets.toml e secrets do Cloud)
+set_config_provider(ChainConfig(EnvConfig(), MappingConfig(st.secrets), SecretsFileConfig()))
+
+@st.cache_resource
+def get_job_service() -> JobService:
+    from package.AzureOCRfile import AzureOCRClient, OCR_LOCALES
+    from package.OpenAITextCorrector import OpenAITextCorrector
+    from package.ImagePreprocessor import ImagePreprocessor
+
+    def ocr_factory(lang: str):
+        # endpoint/chaves vêm do provedor de config (get_config)
+        return AzureOCRClient(locale=OCR_LOCALES.get(lang))
+
+    def corrector_factory(mode: str, lang: str):
+        corrector = OpenAITextCorrector()
+        corrector.configure(mode=mode, lang=lang)
+        return corrector
+
+    # o catálogo recebe status por página e as saídas geradas
+    runner_options = {"max_workers": int(os.getenv("PIPELINE_WORKERS", "4")), "catalog": get_catalog()}
+    # fotos de celular (12+ MP) vão reduzidas para o OCR; pool de processos compartilhado entre jobs
+    if os.getenv("PREPROCESS_IMAGES", "1") != "0":
+        runner_options["preprocessor"] = ImagePreprocessor()
+
+    return JobService(
+        ocr_factory,
+        corrector_factory,
+        max_concurrent_jobs=int(os.getenv("MAX_CONCURRENT_JOBS", "2")),
+        runner_options=runner_options,
+    )
+
+def submit_job(lote: str, mode_label: str, lang_label: str, order_by: str = "name") -> str:
     """
-    Executa main.py como subprocesso, streamando logs na UI.
-    Retorna o returncode.
+    Enfileira o lote no serviço de jobs e guarda o id na sessão.
+    O acompanhamento fica em job_status_panel (sem bloquear o rerun).
     """
     # mapeia labels -> valores esperados pelo back
     mode_map = {"Impresso": "printed", "Manuscrito": "handwritten"}
     lang_map = {"Português 🇧🇷": "por", "Inglês 🇺🇸": "eng", "Espanhol 🇪🇸": "spa", "Francês 🇫🇷": "fra"}
-    mode = mode_map.get(mode_label, "printed")
-    lang = lang_map.get(lang_label, "por")
-
-    input_dir = IMAGES_DIR / lote
-    output_dir = OUTPUT_DIR  # flat
-    cmd = [
-        sys.executable, str(ROOT / "main.py"),
-        "--input-dir", str(input_dir),
-        "--output-dir", str(output_dir),
-        "--mode", mode,
-        "--lang", lang,
-    ]
-
-    log_box = st.empty()
-    progress = st.progress(0, text="⏳ Executando pipeline...")
 
-    try:
-        proc = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
-        )
-    except Exception as e:
-        progress.empty()
-        st.error(f"Não foi possível iniciar o processo: {e}")
-        return 1
-
-    full_log = []
-    i = 0
-    while True:
-        line = proc.stdout.readline()
-        if not line and proc.poll() is not None:
-            break
-        if line:
-            full_log.append(line.rstrip())
-            log_box.code("\n".join(full_log[-80:]), language="bash")
-        # avança barra fake
-        i = (i + 5) % 105
-        progress.progress(min(i, 100), text="⏳ Executando pipeline...")
-
-    returncode = proc.wait()
-    progress.empty()
-
-    if returncode == 0:
+    request = JobRequest(
+        lote=lote,
+        base_dir=str(IMAGES_DIR),
+        output_dir=str(OUTPUT_DIR),  # flat
+        mode=mode_map.get(mode_label, "printed"),
+        lang=lang_map.get(lang_label, "por"),
+        order_by=order_by,
+    )
+    job_id = get_job_service().submit(request)
+    st.session_state["job_id"] = job_id
+    return job_id
+
+@st.fragment(run_every=1.0)
+def job_status_panel():
+    job_id = st.session_state.get("job_id")
+    if not job_id:
+        return
+    service = get_job_service()
+    job = service.get(job_id, log_tail=20)
+    if job is None:
+        return
+
+    if job["status"] in ("queued", "running"):
+        progress = job.get("progress") or {}
+        total = progress.get("pages_total") or 0
+        finished = progress.get("pages_reused", 0) + progress.get("pages_done", 0) + progress.get("pages_failed", 0)
+        if job["status"] == "queued" or not total:
+            st.progress(0, text=f"⏳ Lote {job['lote']} na fila...")
+        else:
+            eta = progress.get("eta_s")
+            eta_txt = f" — ~{int(eta)}s restantes" if eta is not None else ""
+            fail_txt = f", {progress['pages_failed']} falha(s)" if progress.get("pages_failed") else ""
+            st.progress(
+                min(finished / total, 1.0),
+                text=f"⏳ {job['lote']}: {finished}/{total} página(s){fail_txt}{eta_txt}",
+            )
+        with st.expander("Log da execução"):
+            st.code("\n".join(job["log_tail"]), language="bash")
+        return
+
+    # terminou: salva log em logs/ com prefixo do lote (uma vez por job)
+    done_key = f"job_done__{job_id}"
+    if not st.session_state.get(done_key):
+        st.session_state[done_key] = True
+        try:
+            (LOGS_DIR / f"{job['lote']}_run.log").write_text("\n".join(service.logs(job_id)), encoding="utf-8")
+        except Exception as e:
+            st.warning(f"Não consegui salvar log: {e}")
+        if job["returncode"] == 0:
+            st.balloons()
+
+    if job["returncode"] == 0:
         st.success("Processamento concluído.")
     else:
-        st.error(f"Falha no processamento (return code {returncode}).")
-
-    # salva log em logs/ com prefixo do lote
-    try:
-        (LOGS_DIR / f"{lote}_run.log").write_text("\n".join(full_log), encoding="utf-8")
-    except Exception as e:
-        st.warning(f"Não consegui salvar log: {e}")
-
-    return returncode
+        st.error(f"Falha no processamento: {job['error'] or 'veja o log'}.")
+    with st.expander("Log da execução"):
+        st.code("\n".join(job["log_tail"]), language="bash")
 
 # Limpeza automática (inputs) — one-shot por sessão
 if "did_wipe" not in st.session_state:
@@ -185,6 +236,7 @@ def wipe_inputs_if_public_once():
             if IMAGES_DIR.exists():
                 shutil.rmtree(IMAGES_DIR, ignore_errors=True)
             IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+            get_catalog().reset()
             st.sidebar.warning("Modo público: dados limpos no primeiro carregamento desta sessão.")
             st.session_state.did_wipe = True
         except Exception as e:
@@ -196,6 +248,7 @@ def wipe_outputs_if_public_once():
             if OUTPUT_DIR.exists():
                 shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
             OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+            get_catalog().reset(outputs=True)
             st.sidebar.warning("Modo público: output/ limpo no primeiro carregamento desta sessão.")
             st.session_state.did_wipe_outputs = True
         except Exception as e:
@@ -206,6 +259,7 @@ def wipe_inputs_now():
         if IMAGES_DIR.exists():
             shutil.rmtree(IMAGES_DIR, ignore_errors=True)
         IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+        get_catalog().reset()
         st.sidebar.success("Diretório 'images/' limpo agora.")
     except Exception as e:
         st.sidebar.error(f"Erro ao limpar 'images/': {e}")
@@ -215,6 +269,7 @@ def wipe_outputs_now():
     try:
         shutil.rmtree(OUTPUT_DIR, ignore_errors=True)
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        get_catalog().reset(outputs=True)
         st.sidebar.success("Output limpo com sucesso.")
     except Exception as e:
         st.sidebar.error(f"Erro ao limpar output/: {e}")
@@ -268,6 +323,8 @@ def apply_prefix_order(lote: str, df: pd.DataFrame):
         tmp.rename(dst)
         new_names.append(dst.name)
 
+    get_catalog().sync_lote(lote, force=True)  # status/hash seguem os arquivos renomeados
+
     # Atualiza a ordem no estado para os NOVOS nomes (1..N)
     order_key = get_order_state_key(lote)
     st.session_state[order_key] = pd.DataFrame({
@@ -326,6 +383,7 @@ with colA:
                 st.warning("Selecione ao menos uma imagem.")
             else:
                 saved = save_uploads(lote_up, files)
+                get_thumbnails().submit(list_images(lote_up))
                 st.success(f"{saved} arquivo(s) enviado(s) para {lote_up}.")
 
     st.subheader("3) Gerenciar lotes")
@@ -333,7 +391,11 @@ with colA:
     if lotes:
         lote_mng = st.selectbox("Selecione um lote", options=lotes, key="lote_mng")
         imgs = list_images(lote_mng)
-        st.write(f"**{len(imgs)}** imagem(ns) em `{lote_mng}`")
+        counts = get_catalog().status_counts(lote_mng)
+        status_lbl = ", ".join(
+            f"{counts[k]} {lbl}" for k, lbl in (("done", "processada(s)"), ("failed", "com falha")) if counts.get(k)
+        )
+        st.write(f"**{len(imgs)}** imagem(ns) em `{lote_mng}`" + (f" ({status_lbl})" if status_lbl else ""))
 
         # ======= ORDEM MANUAL =======
         st.markdown("**Ordem manual (edite a coluna e salve):**")
@@ -373,11 +435,27 @@ with colA:
         name_to_order = {r.arquivo: r.ordem for r in st.session_state[get_order_state_key(lote_mng)].itertuples()}
         imgs_sorted = sorted(imgs, key=lambda p: name_to_order.get(p.name, 9999))
 
+        # só miniaturas, e só as da página visível (a próxima já vai sendo gerada)
+        thumbs = get_thumbnails()
+        n_pages = max(1, -(-len(imgs_sorted) // THUMBS_PER_PAGE))
+        page = 1
+        if n_pages > 1:
+            page = st.number_input(f"Página da pré-visualização (de {n_pages})", min_value=1, max_value=n_pages,
+                                   value=1, step=1, key=f"thumb_page__{lote_mng}")
+        start = (int(page) - 1) * THUMBS_PER_PAGE
+        visible = imgs_sorted[start:start + THUMBS_PER_PAGE]
+        thumbs.submit(visible)
+        thumbs.submit(imgs_sorted[start + THUMBS_PER_PAGE:start + 2 * THUMBS_PER_PAGE])
+
         grid = st.columns(4)
-        for i, p in enumerate(imgs_sorted):
+        for i, p in enumerate(visible):
             with grid[i % 4]:
                 ord_lbl = name_to_order.get(p.name, "?")
-                st.image(str(p), caption=f"{ord_lbl}. {p.name}", use_container_width=True)
+                thumb = thumbs.get(p, timeout=2.0)
+                if thumb:
+                    st.image(thumb, caption=f"{ord_lbl}. {p.name}", use_container_width=True)
+                else:
+                    st.caption(f"{ord_lbl}. {p.name} (miniatura indisponível)")
 
         # ======= AÇÕES DO LOTE (inline) =======
         colm1, colm2, colm3 = st.columns([3,1,1])
@@ -387,11 +465,13 @@ with colA:
             if nn and nn != lote_mng:
                 try:
                     (IMAGES_DIR / lote_mng).rename(IMAGES_DIR / nn)
+                    get_catalog().rename_lote(lote_mng, nn)
                     st.success(f"Renomeado para {nn}. Atualize a seleção acima.")
                 except Exception as e:
                     st.error(f"Falha ao renomear: {e}")
         if colm3.button("🗑️ Apagar", key="btn_del", use_container_width=True):
             shutil.rmtree(IMAGES_DIR / lote_mng, ignore_errors=True)
+            get_catalog().delete_lote(lote_mng)
             st.error(f"Lote '{lote_mng}' apagado de images/. Saídas em output/ foram mantidas.")
 
 with colB:
@@ -413,7 +493,7 @@ with colB:
         )
         order_map = {
             "Nome (prefixo 001_...)": "name",
-            "Data de modificação ": "mtime",
+            "Data de modificação": "mtime",
             "Data de criação": "ctime"
         }
 
@@ -426,9 +506,9 @@ with colB:
                     st.error(f"🚨 Limite de {MAX_PAGES_PER_RUN} páginas por execução. "
                             "Quer testar mais? Fale comigo 😉")
                 else:
-                    rc = run_main(lote_run, mode_label, lang_label)
-                    if rc == 0:
-                       st.balloons()
+                    submit_job(lote_run, mode_label, lang_label, order_map.get(order_choice, "name"))
+
+        job_status_panel()
 
 
     st.subheader("5) Resultados")
@@ -441,14 +521,28 @@ with colB:
                 st.info(f"Nenhum arquivo em '{lote_dl}'. ")
             else:
                 st.write(f"Arquivos gerados para o lote **{lote_dl}**:")
+                # os bytes só são lidos no rerun do clique em "Preparar" (não a cada interação)
                 for p in outs:
+                    col_name, col_btn = st.columns([3, 1])
                     try:
-                        with open(p, "rb") as f:
-                            st.download_button(f"⬇️ {p.name}", f.read(), file_name=p.name)
-                    except Exception as e:
-                        st.error(f"Falha ao preparar download de {p.name}: {e}")
+                        size_kb = p.stat().st_size / 1024
+                    except FileNotFoundError:
+                        continue
+                    col_name.write(f"📄 {p.name} ({size_kb:,.0f} KB)")
+                    if col_btn.button("Preparar", key=f"btn_prep__{p.name}"):
+                        try:
+                            with open(p, "rb") as f:
+                                col_btn.download_button("⬇️ Baixar", f, file_name=p.name,
+                                                        key=f"btn_dl__{p.name}", on_click="ignore")
+                        except Exception as e:
+                            st.error(f"Falha ao preparar download de {p.name}: {e}")
                 if st.button("📦 Baixar tudo (ZIP)", key="btn_zip"):
-                    data = zip_outputs(outs)
-                    st.download_button("Download ZIP", data, file_name=f"{lote_dl}_outputs.zip", mime="application/zip")
+                    try:
+                        zip_path = get_archives().archive(outs)
+                        with open(zip_path, "rb") as f:
+                            st.download_button("Download ZIP", f, file_name=f"{lote_dl}_outputs.zip",
+                                               mime="application/zip", on_click="ignore")
+                    except Exception as e:
+                        st.error(f"Falha ao gerar o ZIP: {e}")
     else:
         st.info("Pasta output/ ainda vazia.")
@@ -0,0 +1,135 @@
+"""
+Tempo de import a frio dos módulos do pipeline (python -X importtime em
+processos novos), para pegar regressões de inicialização dos workers.
+
+    python bench_imports.py
+    python bench_imports.py --module package.PipelineRunner --top 15
+    python bench_imports.py --budget-ms 150 --results imports.jsonl
+
+Cada módulo roda --repeat vezes num interpretador novo e vale a menor
+medida (a primeira pode incluir compilação de .pyc). O caminho headless não
+pode carregar Streamlit nem as SDKs (openai, azure, python-docx): elas só
+entram na primeira chamada de rede/exportação. Sai com código 1 se algum
+módulo passar do orçamento ou importar um pacote proibido.
+"""
+import sys
+import json
+import argparse
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+# o que um worker headless (main.py / JobService) importa
+HEADLESS_MODULES = [
+    "package.PipelineRunner",
+    "package.JobService",
+    "package.AzureOCRfile",
+    "package.AsyncAzureOCRfile",
+    "package.OpenAITextCorrector",
+    "package.DocxExporter",
+    "package.ImagePreprocessor",
+    "main",
+]
+# pacotes pesados que só podem aparecer sob demanda
+FORBIDDEN = ["streamlit", "pandas", "pyarrow", "tornado", "altair", "openai", "azure", "docx", "lxml", "PIL"]
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Linhas 'import time: self [us] | cumulative | pacote' -> dicts (nível = indentação)."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+            entries.append({
+                "name": name.strip(), "depth": depth,
+                "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+            })
+        except ValueError:
+            continue
+    return entries
+
+
+def measure(module: str) -> tuple[float, list[dict]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} falhou:\n{proc.stderr.strip().splitlines()[-1]}")
+    entries = parse_importtime(proc.stderr)
+    total_ms = sum(e["self_us"] for e in entries) / 1000.0
+    return total_ms, entries
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Tempo de import a frio dos módulos do pipeline.")
+    parser.add_argument("--module", action="append", default=None,
+                        help="Módulo a medir (pode repetir). Padrão: o caminho headless.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="Pacotes mais caros listados por módulo.")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Falha se algum módulo levar mais que isto para importar.")
+    parser.add_argument("--forbid", default=",".join(FORBIDDEN),
+                        help="Pacotes que não podem ser importados (vírgula; '' desliga).")
+    parser.add_argument("--results", default=None, help="Acrescenta um JSON por módulo neste arquivo (.jsonl).")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    modules = args.module or HEADLESS_MODULES
+    forbidden = [f for f in args.forbid.split(",") if f.strip()]
+    failed = False
+    rows = []
+
+    for module in modules:
+        best_ms, best_entries = None, []
+        for _ in range(max(1, args.repeat)):
+            total_ms, entries = measure(module)
+            if best_ms is None or total_ms < best_ms:
+                best_ms, best_entries = total_ms, entries
+
+        loaded = {e["name"].split(".")[0] for e in best_entries}
+        leaked = sorted(f for f in forbidden if f in loaded)
+        over = args.budget_ms is not None and best_ms > args.budget_ms
+        failed = failed or bool(leaked) or over
+
+        status = "ok" if not (leaked or over) else "FALHOU"
+        print(f"{module:<32} {best_ms:8.1f} ms  {len(best_entries):4d} módulos  {status}")
+        if leaked:
+            print(f"    importa pacotes proibidos: {', '.join(leaked)}")
+        if over:
+            print(f"    acima do orçamento de {args.budget_ms:.0f} ms")
+        # custo próprio somado por pacote de topo (asyncio, multiprocessing, package...)
+        by_package: dict[str, int] = {}
+        for e in best_entries:
+            top = e["name"].split(".")[0]
+            by_package[top] = by_package.get(top, 0) + e["self_us"]
+        heaviest = sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]
+        for name, us in heaviest:
+            print(f"    {us / 1000.0:8.1f} ms  {name}")
+
+        rows.append({
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "module": module,
+            "import_ms": round(best_ms, 1),
+            "modules": len(best_entries),
+            "forbidden": leaked,
+            "top": [{"name": name, "ms": round(us / 1000.0, 1)} for name, us in heaviest],
+        })
+
+    if args.results:
+        with open(args.results, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
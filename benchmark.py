@@ -0,0 +1,227 @@
+"""
+Benchmark offline do pipeline (sem Azure/OpenAI): roda o PipelineRunner de
+ponta a ponta com backends simulados (testing/FakeBackends.py) sobre lotes
+sintéticos e mede páginas/s, latência p50/p95 por página e pico de RSS (cada cenário roda num processo
+próprio, para o pico não vazar de um cenário para o outro).
+
+    python benchmark.py --lotes 10,40 --image-kb 300 --workers 4
+    python benchmark.py --workers 1,4,8 --llm-batch-pages 1,4 --results bench.jsonl
+
+Listas separadas por vírgula em --workers/--pages-per-request/--llm-batch-pages
+geram um cenário por combinação; --results acumula um JSON por cenário para
+comparar execuções ao longo do tempo.
+"""
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import itertools
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from package.DiskCache import DiskCache
+from testing.FakeBackends import (
+    FakeOCRClient, FakeTextCorrector, LatencyModel, write_synthetic_lote, write_synthetic_photo_lote,
+)
+from package.ImagePreprocessor import ImagePreprocessor
+from package.PipelineRunner import PipelineRunner
+from package.RunMetrics import percentile
+
+
+class NullExporter:
+    """Só serializa o texto (sem python-docx), para medir o pipeline e não o Word."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def save_text_to_docx(self, text: str, filename: str = "documento.docx") -> Path:
+        path = self.output_dir / filename
+        path.write_text(text, encoding="utf-8")
+        return path
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux devolve KB, macOS bytes
+    return round(peak / (1024 * 1024 if platform.system() == "Darwin" else 1024), 1)
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline com OCR/LLM simulados.")
+    data = parser.add_argument_group("dados sintéticos")
+    data.add_argument("--lotes", type=int_list, default=[12, 40], help="Páginas por lote (um lote por valor).")
+    data.add_argument("--image-kb", type=int_list, default=[150, 900], help="Tamanho médio das imagens (cicla entre os lotes).")
+    data.add_argument("--photos", type=float, default=0.0, metavar="MP",
+                      help="Gera JPEGs reais de MP megapixels (em vez de bytes aleatórios de --image-kb).")
+    data.add_argument("--words", type=int, default=250, help="Palavras por página no analyzeResult simulado.")
+    data.add_argument("--low-conf-share", type=float, default=0.08)
+
+    backends = parser.add_argument_group("backends simulados")
+    backends.add_argument("--ocr-latency", type=float, default=1.2, help="Mediana (s) por requisição de OCR.")
+    backends.add_argument("--ocr-per-mb", type=float, default=0.4, help="Segundos extras por MB enviado.")
+    backends.add_argument("--llm-latency", type=float, default=0.6, help="Mediana (s) por requisição de correção.")
+    backends.add_argument("--llm-per-token", type=float, default=0.002, help="Segundos por token de saída.")
+    backends.add_argument("--sigma", type=float, default=0.4, help="Dispersão lognormal das latências.")
+    backends.add_argument("--failure-rate", type=float, default=0.0)
+    backends.add_argument("--time-scale", type=float, default=1.0,
+                          help="Multiplica todas as latências (ex.: 0.1 para rodadas rápidas).")
+
+    pipeline = parser.add_argument_group("pipeline (listas geram um cenário por combinação)")
+    pipeline.add_argument("--workers", type=int_list, default=[4])
+    pipeline.add_argument("--pages-per-request", type=int_list, default=[1])
+    pipeline.add_argument("--llm-batch-pages", type=int_list, default=[1])
+    pipeline.add_argument("--queue-size", type=int, default=8)
+    pipeline.add_argument("--cache", action="store_true", help="Usa cache de OCR (segunda rodada vira hit).")
+    pipeline.add_argument("--preprocess", action="store_true",
+                          help="Reduz as imagens antes do OCR (use com --photos; cache por cenário).")
+    pipeline.add_argument("--repeat", type=int, default=1, help="Rodadas por cenário.")
+    pipeline.add_argument("--seed", type=int, default=1)
+
+    parser.add_argument("--results", default=None, help="Acrescenta um JSON por cenário neste arquivo.")
+    parser.add_argument("--keep", action="store_true", help="Não apaga a pasta temporária.")
+    return parser
+
+
+def run_scenario(args, workers: int, pages_per_request: int, llm_batch_pages: int, repeat: int, root: Path) -> dict:
+    scale = args.time_scale
+    base_dir = root / f"run_{workers}_{pages_per_request}_{llm_batch_pages}_{repeat}" / "images"
+    for i, pages in enumerate(args.lotes):
+        if args.photos:
+            write_synthetic_photo_lote(base_dir / f"lote{i + 1:02d}", pages, args.photos, seed=args.seed + i)
+        else:
+            image_kb = args.image_kb[i % len(args.image_kb)]
+            write_synthetic_lote(base_dir / f"lote{i + 1:02d}", pages, image_kb, seed=args.seed + i)
+
+    # cache por cenário: a 2ª rodada do mesmo cenário é que vira hit
+    cache = DiskCache(root / "cache" / f"{workers}_{pages_per_request}_{llm_batch_pages}") if args.cache else None
+    ocr = FakeOCRClient(
+        latency=LatencyModel(args.ocr_latency * scale, args.sigma, args.ocr_per_mb * scale, seed=args.seed),
+        failure_rate=args.failure_rate,
+        words_per_page=args.words,
+        low_conf_share=args.low_conf_share,
+        cache=cache,
+        pages_per_request=pages_per_request,
+        seed=args.seed,
+    )
+    corrector = FakeTextCorrector(
+        latency=LatencyModel(args.llm_latency * scale, args.sigma, seed=args.seed + 1),
+        per_output_token=args.llm_per_token * scale,
+        failure_rate=args.failure_rate,
+        seed=args.seed + 1,
+    )
+    preprocessor = None
+    if args.preprocess:
+        preprocessor = ImagePreprocessor(cache_dir=root / "preprocess" / f"{workers}_{pages_per_request}_{llm_batch_pages}")
+    runner = PipelineRunner(
+        ocr, corrector, NullExporter(str(base_dir.parent / "output")),
+        base_dir=str(base_dir),
+        output_dir=str(base_dir.parent / "output"),
+        max_workers=workers,
+        queue_size=args.queue_size,
+        pages_per_request=pages_per_request,
+        llm_batch_pages=llm_batch_pages,
+        llm_batch_linger=0.5 * scale,
+        use_manifest=False,
+        log=lambda message: None,
+        metrics_dir=str(base_dir.parent / "metrics"),
+        preprocessor=preprocessor,
+    )
+    # falhas simuladas não vão para os logs reais do app
+    runner.failed_log_path = base_dir.parent / "falhas_ocr.txt"
+    runner.routes_log_path = base_dir.parent / "rotas_correcao.jsonl"
+
+    t0 = time.perf_counter()
+    try:
+        summary = runner.run()
+    finally:
+        if preprocessor is not None:
+            preprocessor.close()
+    wall = time.perf_counter() - t0
+
+    # latência por página = tempo no estágio de OCR + no de correção
+    per_page: dict = {}
+    for sample in runner.metrics.samples:
+        if sample["stage"] in ("ocr", "llm"):
+            key = (sample.get("lote"), sample.get("arquivo"))
+            per_page[key] = per_page.get(key, 0.0) + sample["seconds"]
+    latencies = sorted(per_page.values())
+    stages = runner.metrics.summary()
+
+    return {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "workers": workers,
+        "pages_per_request": pages_per_request,
+        "llm_batch_pages": llm_batch_pages,
+        "repeat": repeat,
+        "pages": summary["pages"],
+        "failed": summary["failed"],
+        "wall_s": round(wall, 3),
+        "pages_per_s": round(summary["processed"] / wall, 3) if wall else 0.0,
+        "page_p50_s": round(percentile(latencies, 50), 3),
+        "page_p95_s": round(percentile(latencies, 95), 3),
+        "ocr_mb_sent": round(stages.get("ocr.submit", {}).get("bytes", 0) / 1e6, 2),
+        "ocr_requests": ocr.requests,
+        "llm_requests": corrector.requests,
+        "peak_rss_mb": peak_rss_mb(),
+        "bottleneck": max(runner.stage_stats, key=lambda s: runner.stage_stats[s]["utilization"]) if runner.stage_stats else None,
+        "stages": {name: {k: st[k] for k in ("count", "p50_s", "p95_s", "total_s")} for name, st in stages.items()},
+        "config": {
+            "lotes": args.lotes, "image_kb": args.image_kb, "time_scale": scale,
+            "failure_rate": args.failure_rate, "cache": args.cache,
+            "photos_mp": args.photos, "preprocess": args.preprocess,
+        },
+    }
+
+
+def run_isolated(args, workers: int, pages_per_request: int, llm_batch_pages: int, repeat: int, root: Path) -> dict:
+    """Roda o cenário num processo novo: ru_maxrss é do processo inteiro e só
+    cresce, então num processo compartilhado o RSS de um cenário herdaria o
+    pico dos anteriores."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_scenario, args, workers, pages_per_request, llm_batch_pages, repeat, root).result()
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    root = Path(tempfile.mkdtemp(prefix="ocr_bench_"))
+    results = []
+    try:
+        scenarios = itertools.product(args.workers, args.pages_per_request, args.llm_batch_pages, range(1, args.repeat + 1))
+        print(f"{'workers':>7} {'pág/req':>7} {'llm/req':>7} {'rod':>3} {'págs':>5} {'falhas':>6} "
+              f"{'pág/s':>7} {'p50 s':>7} {'p95 s':>7} {'MB ocr':>7} {'ocr req':>7} {'llm req':>7} {'RSS MB':>7}  gargalo")
+        for workers, ppr, llm_batch, repeat in scenarios:
+            r = run_isolated(args, workers, ppr, llm_batch, repeat, root)
+            results.append(r)
+            print(f"{workers:>7} {ppr:>7} {llm_batch:>7} {repeat:>3} {r['pages']:>5} {r['failed']:>6} "
+                  f"{r['pages_per_s']:>7} {r['page_p50_s']:>7} {r['page_p95_s']:>7} {r['ocr_mb_sent']:>7} {r['ocr_requests']:>7} "
+                  f"{r['llm_requests']:>7} {r['peak_rss_mb'] or '-':>7}  {r['bottleneck']}")
+    finally:
+        if args.keep:
+            print(f"Arquivos em {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if args.results:
+        with open(args.results, "a", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"Resultados acrescentados em {args.results}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,194 @@
-from package.AzureOCRfile import AzureOCRClient
-from package.FileLoader import FileLoader
+from package.AzureOCRfile import AzureOCRClient, OCR_LOCALES, SIDECAR_FORMATS
 from package.OpenAITextCorrector import OpenAITextCorrector
 from package.DocxExporter import DocxExporter
 from package.PipelineRunner import PipelineRunner
+from package.CorrectionPolicy import policy_for_mode
+from package.ProgressTracker import jsonl_sink
+from package.ImagePreprocessor import ImagePreprocessor, PreprocessOptions
+from package.LoteScheduler import SCHEDULE_POLICIES
+from package.Config import get_config
+from package.LoteCatalog import LoteCatalog
 
-import streamlit as st
 import os
+import sys
+import argparse
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
 
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".pdf"}
 
-AZURE_DOC_INTEL_ENDPOINT = (
-    os.getenv("AZURE_DOC_INTEL_ENDPOINT") 
-    or st.secrets.get("AZURE_DOC_INTEL_ENDPOINT")
-)
-AZURE_DOC_INTEL_KEY = (
-    os.getenv("AZURE_DOC_INTEL_KEY") 
-    or st.secrets.get("AZURE_DOC_INTEL_KEY")
-)
 
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="OCR (Azure) + correção (OpenAI) + exportação .docx por lote.")
+    parser.add_argument("--input-dir", default="./images/",
+                        help="Pasta de um lote (images/<lote>) ou a raiz com vários lotes.")
+    parser.add_argument("--lote", action="append", default=None,
+                        help="Processa só este lote (pode repetir). Ignorado se --input-dir já for um lote.")
+    parser.add_argument("--output-dir", default="output")
+    parser.add_argument("--mode", choices=["printed", "handwritten"], default="printed")
+    parser.add_argument("--lang", choices=sorted(OCR_LOCALES), default="por")
+    parser.add_argument("--order-by", choices=["name", "mtime", "ctime"], default="name")
+    parser.add_argument("--schedule", choices=SCHEDULE_POLICIES, default="round_robin",
+                        help="Como dividir os workers entre vários lotes (cada .docx sai quando o lote termina).")
+    parser.add_argument("--progress-jsonl", default=None, metavar="ARQUIVO",
+                        help="Grava eventos de progresso (um JSON por linha); '-' = stdout.")
+    parser.add_argument("--metrics-dir", default=None,
+                        help="Pasta do relatório de tempos por etapa (padrão: package/logs/metrics).")
+    parser.add_argument("--profile", default=None, metavar="ARQUIVO.prof",
+                        help="Roda com cProfile nos workers e grava o perfil (abrir com pstats/snakeviz).")
 
-ocr = AzureOCRClient()
-corrector = OpenAITextCorrector()
-exporter = DocxExporter("output")
+    perf = parser.add_argument_group("concorrência / lotes de requisição")
+    perf.add_argument("--workers", type=int, default=4, help="Workers por estágio (padrão para OCR e LLM).")
+    perf.add_argument("--ocr-workers", type=int, default=None)
+    perf.add_argument("--llm-workers", type=int, default=None)
+    perf.add_argument("--queue-size", type=int, default=8)
+    perf.add_argument("--pages-per-request", type=int, default=1, help="Páginas por análise no Azure (PDF multipágina).")
+    perf.add_argument("--llm-batch-pages", type=int, default=1, help="Páginas por requisição de correção.")
 
-runner = PipelineRunner(ocr, corrector, exporter,base_dir='./images/')
-runner.run()
+    prep = parser.add_argument_group("pré-processamento das imagens (antes do OCR)")
+    prep.add_argument("--preprocess", action="store_true",
+                      help="Gira pelo EXIF, reduz, converte para cinza e recomprime antes de enviar ao OCR.")
+    prep.add_argument("--max-long-edge", type=int, default=PreprocessOptions.max_long_edge)
+    prep.add_argument("--jpeg-quality", type=int, default=PreprocessOptions.jpeg_quality)
+    prep.add_argument("--keep-color", action="store_true", help="Não converte para tons de cinza.")
+
+    cache = parser.add_argument_group("cache / reprocessamento")
+    cache.add_argument("--force-ocr", action="store_true", help="Refaz OCR e correção de todas as páginas.")
+    cache.add_argument("--no-cache", action="store_true", help="Desliga os caches de OCR e de correção.")
+    cache.add_argument("--no-manifest", action="store_true", help="Não reaproveita páginas já corrigidas.")
+    cache.add_argument("--no-catalog", action="store_true",
+                       help="Não usa o catálogo SQLite (lista as pastas a cada execução; status/saídas não ficam registrados).")
+    cache.add_argument("--sidecar-format", choices=SIDECAR_FORMATS, default="words",
+                       help="OCR salvo ao lado da imagem: words = compacto (.words.gz), json = JSON completo, both. "
+                            "Com --no-cache, words também grava o JSON (não há outra cópia do resultado bruto).")
+
+    llm = parser.add_argument_group("correção")
+    llm.add_argument("--model", default="gpt-4o-mini")
+    llm.add_argument("--cheap-model", default=None,
+                     help="Modelo para páginas com OCR quase limpo (requer a política de confiança).")
+    llm.add_argument("--gating", choices=["auto", "on", "off"], default="off",
+                     help="Pular/baratear páginas com OCR limpo (opt-in). auto = ligado só para --mode printed.")
+    return parser
+
+
+def has_images(folder: Path) -> bool:
+    return any(p.is_file() and p.suffix.lower() in IMAGE_EXTS for p in folder.iterdir())
+
+
+def resolve_scope(input_dir: Path, lotes):
+    """
+    --input-dir pode ser a raiz (images/) ou um lote (images/<lote>). É um lote
+    se tiver imagens ou, vazio, se não tiver subpastas (uma raiz tem os lotes).
+    """
+    has_subdirs = any(p.is_dir() and not p.name.startswith(".") for p in input_dir.iterdir())
+    if has_images(input_dir) or not has_subdirs:
+        return input_dir.parent, [input_dir.name]
+    return input_dir, lotes
+
+
+def check_lotes(base_dir: Path, lotes) -> list:
+    """Mensagens de erro para lotes pedidos que não existem em base_dir ou não têm imagens."""
+    errors = []
+    for name in lotes or []:
+        folder = base_dir / name
+        if not folder.is_dir():
+            errors.append(f"Lote não encontrado: {name} (em {base_dir})")
+        elif not has_images(folder):
+            errors.append(f"Lote sem imagens: {name} ({folder})")
+    return errors
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    input_dir = Path(args.input_dir)
+    if not input_dir.is_dir():
+        print(f"Diretório de entrada não encontrado: {input_dir}")
+        return 2
+    base_dir, lotes = resolve_scope(input_dir, args.lote)
+    errors = check_lotes(base_dir, lotes)
+    if errors:
+        for error in errors:
+            print(error)
+        return 2
+
+    use_cache = not args.no_cache
+    ocr = AzureOCRClient(
+        endpoint=get_config("AZURE_DOC_INTEL_ENDPOINT"),
+        key=get_config("AZURE_DOC_INTEL_KEY"),
+        locale=OCR_LOCALES[args.lang],
+        use_cache=use_cache,
+        pages_per_request=args.pages_per_request,
+        sidecar_format=args.sidecar_format,
+    )
+    api_key = get_config("OPENAI_API_KEY")
+    corrector = OpenAITextCorrector(api_key=api_key, model=args.model, use_cache=use_cache)
+    corrector.configure(mode=args.mode, lang=args.lang)
+
+    policy = policy_for_mode(args.mode, args.gating)
+    cheap_corrector = None
+    if policy is not None and args.cheap_model:
+        cheap_corrector = OpenAITextCorrector(api_key=api_key, model=args.cheap_model, use_cache=use_cache)
+        cheap_corrector.configure(mode=args.mode, lang=args.lang)
+
+    events_file = None
+    on_event = None
+    if args.progress_jsonl == "-":
+        on_event = jsonl_sink(sys.stdout)
+    elif args.progress_jsonl:
+        events_file = open(args.progress_jsonl, "a", encoding="utf-8")
+        on_event = jsonl_sink(events_file)
+
+    preprocessor = None
+    if args.preprocess:
+        preprocessor = ImagePreprocessor(PreprocessOptions(
+            max_long_edge=args.max_long_edge,
+            grayscale=not args.keep_color,
+            jpeg_quality=args.jpeg_quality,
+        ))
+
+    # mesmo catálogo do app: status por página e saídas ficam visíveis lá
+    catalog = None if args.no_catalog else LoteCatalog(base_dir, output_dir=args.output_dir)
+
+    exporter = DocxExporter(args.output_dir)
+    runner = PipelineRunner(
+        ocr, corrector, exporter,
+        base_dir=str(base_dir),
+        output_dir=args.output_dir,
+        order_by=args.order_by,
+        max_workers=args.workers,
+        ocr_workers=args.ocr_workers,
+        llm_workers=args.llm_workers,
+        queue_size=args.queue_size,
+        llm_batch_pages=args.llm_batch_pages,
+        correction_policy=policy,
+        cheap_corrector=cheap_corrector,
+        use_manifest=not args.no_manifest,
+        on_event=on_event,
+        metrics_dir=args.metrics_dir,
+        profile_path=args.profile,
+        preprocessor=preprocessor,
+        schedule_policy=args.schedule,
+        catalog=catalog,
+    )
+
+    try:
+        summary = runner.run(force_ocr=args.force_ocr, lotes=lotes)
+    finally:
+        if events_file is not None:
+            events_file.close()
+        if preprocessor is not None:
+            preprocessor.close()
+        if catalog is not None:
+            catalog.close()
+    print(
+        f"Resumo: {summary['pages']} página(s) em {len(summary['lotes'])} lote(s); "
+        f"{summary['processed']} processada(s), {summary['reused']} reaproveitada(s), {summary['failed']} falha(s)."
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import os
+import asyncio
+from typing import Any, Optional
+
+from package.Config import get_config
+from package.DiskCache import DiskCache
+from package.AzureOCRfile import SIDECAR_FORMATS, default_ocr_cache, write_sidecars, result_to_text
+from package.RateLimiter import AdaptiveLimiter, limiter_for
+from package.RunMetrics import timed
+
+
+class AsyncAzureOCRClient:
+    """
+    Versão assíncrona do AzureOCRClient (azure.ai.documentintelligence.aio).
+
+    Um único cliente aio = um único pool de conexões; várias análises ficam
+    em polling ao mesmo tempo, limitadas por max_concurrency. Todas as
+    chamadas devem acontecer no mesmo event loop (o PipelineRunner cuida
+    disso quando recebe este cliente como ocr_client).
+    """
+
+    def __init__(
+        self,
+        endpoint: str = None,
+        key: str = None,
+        model_id: str = "prebuilt-read",
+        locale: Optional[str] = None,   # dica de idioma para o OCR (ex.: "pt-BR")
+        cache: Optional[DiskCache] = None,
+        use_cache: bool = True,
+        max_concurrency: int = 32,
+        transport: Any = None,          # ex.: FakeAsyncAnalyzeTransport para rodar offline
+        polling_interval: Optional[float] = None,
+        rate_limiter: Optional[AdaptiveLimiter] = None,  # padrão: o limitador compartilhado do Azure
+        sidecar_format: str = "words",  # ver SIDECAR_FORMATS
+    ):
+        self.endpoint = endpoint or get_config("AZURE_DOC_INTEL_ENDPOINT")
+        self.key = key or get_config("AZURE_DOC_INTEL_KEY")
+        self.model_id = model_id
+        self.locale = locale
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.polling_interval = polling_interval
+        if sidecar_format not in SIDECAR_FORMATS:
+            raise ValueError(f"sidecar_format inválido: {sidecar_format!r} (use {', '.join(SIDECAR_FORMATS)})")
+        self.sidecar_format = sidecar_format
+
+        self.transport = transport
+        self._client = None
+        self.rate_limiter = rate_limiter or limiter_for("azure_ocr")
+
+        if cache is None and use_cache:
+            cache = default_ocr_cache()
+        self.cache = cache
+
+        # criado no loop em que o cliente é usado pela primeira vez
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def client(self):
+        # import da SDK adiado até a primeira análise (todas no mesmo loop, sem lock)
+        if self._client is None:
+            from azure.core.credentials import AzureKeyCredential
+            from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
+
+            client_kwargs = {"transport": self.transport} if self.transport is not None else {}
+            # retries ficam com o rate_limiter (ver AzureOCRClient)
+            self._client = DocumentIntelligenceClient(
+                endpoint=self.endpoint,
+                credential=AzureKeyCredential(self.key),
+                retry_total=0,
+                **client_kwargs,
+            )
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    async def extract_text(self, file_path: str, save_json: bool = True, upload_path: Optional[str] = None) -> str:
+        result_dict = await self._analyze(upload_path or file_path)
+
+        if save_json:
+            await asyncio.to_thread(write_sidecars, file_path, result_dict, self.sidecar_format, self.cache is not None)
+
+        return result_to_text(result_dict)
+
+    async def extract_raw_json(self, file_path: str) -> dict:
+        return await self._analyze(file_path)
+
+    async def _analyze(self, file_path: str) -> dict:
+        cache_key = None
+        if self.cache is not None:
+            with timed("ocr.cache_lookup") as m:
+                cache_key = await asyncio.to_thread(self.cache_key_for, file_path)
+                cached = await asyncio.to_thread(self.cache.get, cache_key)
+                m["hit"] = int(cached is not None)
+            if cached is not None:
+                return cached
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        analyze_kwargs = {"polling_interval": self.polling_interval} if self.polling_interval is not None else {}
+        if self.locale:
+            analyze_kwargs["locale"] = self.locale
+
+        async def attempt():
+            # corpo enviado direto do arquivo (application/octet-stream), sem base64
+            with open(file_path, "rb") as f:
+                with timed("ocr.submit", bytes=os.fstat(f.fileno()).st_size):
+                    poller = await self.client.begin_analyze_document(
+                        model_id=self.model_id,
+                        analyze_request=f,
+                        content_type="application/octet-stream",
+                        **analyze_kwargs,
+                    )
+            with timed("ocr.poll"):
+                return await poller.result()
+
+        async with self._semaphore:
+            result = await self.rate_limiter.call_async(attempt)
+        result_dict = result.as_dict()
+
+        if cache_key is not None:
+            await asyncio.to_thread(self.cache.set, cache_key, result_dict)
+        return result_dict
+
+    def cache_key_for(self, file_path: str) -> str:
+        parts = (self.model_id, self.locale) if self.locale else (self.model_id,)
+        return DiskCache.make_file_key(*parts, file_path=file_path)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def rate_limit_stats(self) -> dict:
+        return self.rate_limiter.stats()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import contextvars
+from typing import Any, Awaitable, Optional
+
+
+class AsyncBridge:
+    """
+    Event loop dedicado numa thread daemon, para que código síncrono (os
+    workers do PipelineRunner) chame clientes assíncronos. Um único loop
+    mantém um único pool de conexões vivo entre chamadas.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="async-bridge", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """
+        Executa a coroutine no loop da ponte e bloqueia a thread atual até o
+        resultado. A coroutine roda numa cópia do contexto de quem chamou
+        (métricas ativas via bind(), rótulos de lote/arquivo).
+        """
+        loop = self._ensure_started()
+        context = contextvars.copy_context()
+        return asyncio.run_coroutine_threadsafe(self._in_context(coro, context), loop).result()
+
+    @staticmethod
+    async def _in_context(coro: Awaitable[Any], context: contextvars.Context) -> Any:
+        # a task herda o contexto corrente no momento da criação
+        return await context.run(asyncio.ensure_future, coro)
+
+    def close(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
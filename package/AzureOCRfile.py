@@ -1,57 +1,252 @@
 import os
-import base64
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence import DocumentIntelligenceClient
+import re
+import threading
 from pathlib import Path
+from typing import BinaryIO, List, Optional, Union
 
 import json
 
+from package.Config import get_config
+from package.DiskCache import DiskCache, CACHE_ROOT
+from package.MultiPageBatch import pack_images, split_analyze_result
+from package.OCRWords import WORDS_SUFFIX, write_words, words_path, words_source_hash
+from package.RateLimiter import AdaptiveLimiter, limiter_for
+from package.RunMetrics import timed
+
+
+# idioma da UI/CLI -> locale do Document Intelligence
+OCR_LOCALES = {"por": "pt-BR", "eng": "en-US", "spa": "es-ES", "fra": "fr-FR"}
+
+
+def default_ocr_cache() -> DiskCache:
+    max_mb = int(os.getenv("OCR_CACHE_MAX_MB", "512"))
+    return DiskCache(CACHE_ROOT / "ocr", max_bytes=max_mb * 1024 * 1024)
+
+
+# hash da imagem de origem, primeira chave do .json (lida sem carregar o documento)
+SOURCE_HASH_KEY = "ocrSourceHash"
+_SOURCE_HASH_RE = re.compile(r'"ocrSourceHash":\s*"([0-9a-f]+)"')
+
+
+def write_json_sidecar(file_path: str, result_dict: dict, source_hash: Optional[str] = None) -> Path:
+    output_path = Path(file_path).with_suffix(".json")
+    payload = {SOURCE_HASH_KEY: source_hash, **result_dict} if source_hash else result_dict
+    with timed("ocr.sidecar_write", format="json"):
+        with open(output_path, "w", encoding="utf-8") as out_file:
+            json.dump(payload, out_file, ensure_ascii=False, indent=2)
+    return output_path
+
+
+def sidecar_source_hash(path: Union[str, Path]) -> Optional[str]:
+    """Hash da imagem de que o sidecar (.words.gz ou .json) foi gerado; None em sidecars antigos."""
+    path = Path(path)
+    if path.name.endswith(WORDS_SUFFIX):
+        return words_source_hash(path)
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        match = _SOURCE_HASH_RE.search(f.read(512))
+    return match.group(1) if match else None
+
+
+# "words": só o sidecar compacto (.words.gz); "json": JSON completo (formato
+# antigo); "both": os dois. Com "words" o JSON bruto fica no cache de OCR; sem
+# cache (use_cache=False) ele não teria onde ficar, então o .json também é gravado.
+SIDECAR_FORMATS = ("words", "json", "both")
+
+
+def write_sidecars(file_path: str, result_dict: dict, sidecar_format: str = "words", raw_cached: bool = True) -> None:
+    """
+    Sidecars são cópias derivadas do resultado do OCR (a fonte é o cache por
+    conteúdo): levam o hash da imagem para o PipelineRunner ignorar os de
+    um conteúdo anterior com o mesmo nome.
+    """
+    if sidecar_format == "words" and not raw_cached:
+        sidecar_format = "both"
+    source_hash = DiskCache.make_file_key(file_path=file_path)
+    if sidecar_format in ("words", "both"):
+        with timed("ocr.sidecar_write", format="words"):
+            write_words(words_path(file_path), result_dict, source_hash)
+    if sidecar_format in ("json", "both"):
+        write_json_sidecar(file_path, result_dict, source_hash)
+
+
+def result_to_text(result_dict: dict) -> str:
+    return "\n".join(
+        line.get("content", "")
+        for page in result_dict.get("pages", [])
+        for line in page.get("lines", [])
+    )
+
 
 class AzureOCRClient:
-    def __init__(self, endpoint: str = None, key: str = None):
-        self.endpoint = endpoint or os.getenv("AZURE_DOC_INTEL_ENDPOINT")
-        self.key = key or os.getenv("AZURE_DOC_INTEL_KEY")
-        self.client = DocumentIntelligenceClient(
-            endpoint=self.endpoint,
-            credential=AzureKeyCredential(self.key)
-        )
-
-   
-    def extract_text(self, file_path: str, save_json: bool = True) -> str:
-    
-     with open(file_path, "rb") as f:
-        base64_data = base64.b64encode(f.read()).decode("utf-8")
-
-        poller = self.client.begin_analyze_document(
-            model_id="prebuilt-read",
-            analyze_request={"base64Source": base64_data}
-        )
-
-        result = poller.result()
-        result_dict = result.as_dict()
+    def __init__(
+        self,
+        endpoint: str = None,
+        key: str = None,
+        model_id: str = "prebuilt-read",
+        locale: Optional[str] = None,   # dica de idioma para o OCR (ex.: "pt-BR")
+        cache: Optional[DiskCache] = None,
+        use_cache: bool = True,
+        pages_per_request: int = 1,     # >1: várias imagens num único PDF/TIFF por análise
+        batch_format: str = "pdf",      # "pdf" | "tiff"
+        rate_limiter: Optional[AdaptiveLimiter] = None,  # padrão: o limitador compartilhado do Azure
+        sidecar_format: str = "words",  # ver SIDECAR_FORMATS
+    ):
+        self.endpoint = endpoint or get_config("AZURE_DOC_INTEL_ENDPOINT")
+        self.key = key or get_config("AZURE_DOC_INTEL_KEY")
+        self.model_id = model_id
+        self.locale = locale
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.rate_limiter = rate_limiter or limiter_for("azure_ocr")
 
-        if save_json:
-            output_path = Path(file_path).with_suffix(".json")
-            with open(output_path, "w", encoding="utf-8") as out_file:
-                json.dump(result_dict, out_file, ensure_ascii=False, indent=2)
+        # cache por hash da imagem + modelo, fora de images/ (sobrevive a
+        # renomeações, re-uploads e à limpeza do modo público)
+        if cache is None and use_cache:
+            cache = default_ocr_cache()
+        self.cache = cache
+
+        self.pages_per_request = max(1, int(pages_per_request))
+        self.batch_format = batch_format
+        if sidecar_format not in SIDECAR_FORMATS:
+            raise ValueError(f"sidecar_format inválido: {sidecar_format!r} (use {', '.join(SIDECAR_FORMATS)})")
+        self.sidecar_format = sidecar_format
 
-        return "\n".join([line.content for page in result.pages for line in page.lines])
+    @property
+    def client(self):
+        # a SDK do Azure só é importada na primeira análise (acerto de cache não paga o import)
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from azure.core.credentials import AzureKeyCredential
+                    from azure.ai.documentintelligence import DocumentIntelligenceClient
 
+                    # retries ficam com o rate_limiter (Retry-After, backoff com jitter e
+                    # concorrência adaptativa compartilhados entre clientes)
+                    self._client = DocumentIntelligenceClient(
+                        endpoint=self.endpoint,
+                        credential=AzureKeyCredential(self.key),
+                        retry_total=0,
+                    )
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    def extract_text(self, file_path: str, save_json: bool = True, upload_path: Optional[str] = None) -> str:
+        """upload_path: versão pré-processada enviada no lugar do arquivo (sidecars seguem ao lado de file_path)."""
+        result_dict = self._analyze(upload_path or file_path)
+
+        if save_json:
+            write_sidecars(file_path, result_dict, self.sidecar_format, self.cache is not None)
+
+        return result_to_text(result_dict)
 
     def extract_raw_json(self, file_path: str) -> dict:
+        return self._analyze(file_path)
+
+    def extract_text_batch(
+        self,
+        file_paths: List[str],
+        save_json: bool = True,
+        pages_per_request: Optional[int] = None,
+        upload_paths: Optional[List[str]] = None,
+    ) -> List[str]:
+        results = self.extract_raw_json_batch(upload_paths or file_paths, pages_per_request)
+
+        if save_json:
+            for file_path, result_dict in zip(file_paths, results):
+                write_sidecars(file_path, result_dict, self.sidecar_format, self.cache is not None)
+
+        return [result_to_text(result_dict) for result_dict in results]
+
+    def extract_raw_json_batch(self, file_paths: List[str], pages_per_request: Optional[int] = None) -> List[dict]:
+        """
+        Analisa várias imagens juntando até pages_per_request delas por
+        requisição (um documento multipágina) e devolve um resultado por
+        imagem, na mesma ordem. O cache continua sendo por imagem.
+        """
+        results: List[Optional[dict]] = [None] * len(file_paths)
+        pending = []  # (índice, bytes, chave de cache)
 
+        for i, file_path in enumerate(file_paths):
+            with timed("ocr.read") as m:
+                with open(file_path, "rb") as f:
+                    data = f.read()
+                m["bytes"] = len(data)
+            cache_key = DiskCache.make_key(*self._cache_parts(), data) if self.cache is not None else None
+            cached = self.cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, data, cache_key))
+
+        per_request = max(1, int(pages_per_request or self.pages_per_request))
+        for start in range(0, len(pending), per_request):
+            chunk = pending[start:start + per_request]
+            if len(chunk) == 1:
+                pages = [self._submit(chunk[0][1])]
+            else:
+                with timed("ocr.pack", pages=len(chunk)):
+                    packed = pack_images([data for _, data, _ in chunk], self.batch_format)
+                combined = self._submit(packed)
+                pages = split_analyze_result(combined, len(chunk))
+
+            for (i, _, cache_key), result_dict in zip(chunk, pages):
+                results[i] = result_dict
+                if cache_key is not None:
+                    self.cache.set(cache_key, result_dict)
+
+        return results
+
+    def _analyze(self, file_path: str) -> dict:
+        cache_key = None
+        if self.cache is not None:
+            with timed("ocr.cache_lookup") as m:
+                cache_key = self.cache_key_for(file_path)
+                cached = self.cache.get(cache_key)
+                m["hit"] = int(cached is not None)
+            if cached is not None:
+                return cached
+
+        # corpo enviado direto do arquivo, sem cópia em memória nem base64
         with open(file_path, "rb") as f:
-            base64_data = base64.b64encode(f.read()).decode("utf-8")
+            result_dict = self._submit(f)
+
+        if cache_key is not None:
+            self.cache.set(cache_key, result_dict)
+        return result_dict
+
+    def _cache_parts(self) -> tuple:
+        # o locale só entra na chave quando informado (chaves antigas continuam valendo)
+        return (self.model_id, self.locale) if self.locale else (self.model_id,)
+
+    def cache_key_for(self, file_path: str) -> str:
+        return DiskCache.make_file_key(*self._cache_parts(), file_path=file_path)
+
+    def _submit(self, body: Union[bytes, BinaryIO]) -> dict:
+        locale_kwargs = {"locale": self.locale} if self.locale else {}
+        size = len(body) if isinstance(body, (bytes, bytearray)) else os.fstat(body.fileno()).st_size
 
-        poller = self.client.begin_analyze_document(
-            model_id="prebuilt-read",
-            analyze_request={"base64Source": base64_data}
-        )
+        def attempt() -> dict:
+            if hasattr(body, "seek"):
+                body.seek(0)  # nova tentativa reenvia o arquivo desde o início
+            # envio (upload + 202) e polling medidos separadamente
+            with timed("ocr.submit", bytes=size):
+                poller = self.client.begin_analyze_document(
+                    model_id=self.model_id,
+                    analyze_request=body,
+                    content_type="application/octet-stream",
+                    **locale_kwargs,
+                )
+            with timed("ocr.poll"):
+                result = poller.result()
+            return result.as_dict()
 
-        result = poller.result()
-   
-   
-        return result.as_dict()
+        return self.rate_limiter.call(attempt)
 
+    def rate_limit_stats(self) -> dict:
+        return self.rate_limiter.stats()
 
-   
\ No newline at end of file
+    def cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
@@ -0,0 +1,112 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Mapping, Optional, Sequence
+
+from package.DiskCache import REPO_ROOT
+
+
+class EnvConfig:
+    """Variáveis de ambiente; carrega o .env (python-dotenv) na primeira consulta."""
+
+    def __init__(self, dotenv: bool = True):
+        self.dotenv = dotenv
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[str]:
+        if self.dotenv and not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        from dotenv import load_dotenv
+                        load_dotenv()
+                    except ImportError:
+                        pass
+                    self._loaded = True
+        return os.getenv(name) or None
+
+
+class SecretsFileConfig:
+    """
+    .streamlit/secrets.toml lido direto com tomllib (mesmo arquivo do
+    st.secrets, sem importar o Streamlit). Procura no diretório atual e na
+    raiz do repositório; só chaves de topo.
+    """
+
+    def __init__(self, paths: Optional[Sequence[Path]] = None):
+        self.paths = [Path(p) for p in paths] if paths else [
+            Path.cwd() / ".streamlit" / "secrets.toml",
+            REPO_ROOT / ".streamlit" / "secrets.toml",
+        ]
+        self._values: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[str]:
+        with self._lock:
+            if self._values is None:
+                self._values = self._load()
+        value = self._values.get(name)
+        return str(value) if value not in (None, "") and not isinstance(value, dict) else None
+
+    def _load(self) -> dict:
+        import tomllib
+
+        values: dict = {}
+        for path in reversed(self.paths):  # o primeiro da lista tem precedência
+            try:
+                with open(path, "rb") as f:
+                    values.update(tomllib.load(f))
+            except (OSError, tomllib.TOMLDecodeError):
+                continue
+        return values
+
+
+class MappingConfig:
+    """Qualquer objeto com .get(nome) (dict, st.secrets...); erros de leitura viram None."""
+
+    def __init__(self, values: Mapping[str, Any]):
+        self.values = values
+
+    def get(self, name: str) -> Optional[str]:
+        try:
+            value = self.values.get(name)
+        except Exception:  # st.secrets sem secrets.toml levanta na primeira leitura
+            return None
+        return str(value) if value not in (None, "") else None
+
+
+class ChainConfig:
+    """Primeiro provedor que tiver a chave vence."""
+
+    def __init__(self, *providers):
+        self.providers = list(providers)
+
+    def get(self, name: str) -> Optional[str]:
+        for provider in self.providers:
+            value = provider.get(name)
+            if value is not None:
+                return value
+        return None
+
+
+_provider: Any = ChainConfig(EnvConfig(), SecretsFileConfig())
+
+
+def set_config_provider(provider: Any) -> None:
+    """Troca a origem das credenciais (ex.: o app põe o st.secrets na cadeia)."""
+    global _provider
+    _provider = provider
+
+
+def get_config_provider() -> Any:
+    return _provider
+
+
+def get_config(name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Credenciais/configuração do pipeline (AZURE_DOC_INTEL_*, OPENAI_API_KEY...).
+    Padrão: ambiente (+ .env) e depois .streamlit/secrets.toml.
+    """
+    value = _provider.get(name)
+    return value if value is not None else default
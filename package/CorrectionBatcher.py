@@ -0,0 +1,78 @@
+import threading
+import contextvars
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+
+from package.RunMetrics import timed
+from package.TextChunking import estimate_tokens
+
+
+class CorrectionBatcher:
+    """
+    Junta páginas que chegam uma a uma no estágio de correção e as envia
+    juntas via correct_texts. Um lote sai quando atinge max_pages ou
+    token_budget, ou após `linger` segundos esperando companhia.
+    Cada worker bloqueia até a sua página voltar, então o estágio de
+    correção precisa de pelo menos max_pages workers por lote em voo
+    (o PipelineRunner dimensiona isso sozinho).
+    """
+
+    def __init__(self, corrector: Any, token_budget: int, max_pages: int = 8, linger: float = 0.5):
+        self.corrector = corrector
+        self.token_budget = max(1, int(token_budget))
+        self.max_pages = max(1, int(max_pages))
+        self.linger = linger
+
+        self._pending: List[Tuple[str, Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def correct_text(self, text: str) -> str:
+        future: Future = Future()
+        cost = estimate_tokens(text)
+        ready = []
+
+        with self._lock:
+            if self._pending and self._pending_tokens + cost > self.token_budget:
+                ready.append(self._take())
+            self._pending.append((text, future))
+            self._pending_tokens += cost
+            if len(self._pending) >= self.max_pages or self._pending_tokens >= self.token_budget:
+                ready.append(self._take())
+            elif self._timer is None:
+                # o flush por tempo roda em outra thread: leva junto o contexto
+                # (métricas da execução) de quem abriu o lote
+                self._timer = threading.Timer(self.linger, contextvars.copy_context().run, args=(self.flush,))
+                self._timer.daemon = True
+                self._timer.start()
+
+        for batch in ready:
+            self._send(batch)
+        return future.result()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch = self._take()
+        self._send(batch)
+
+    def _take(self) -> List[Tuple[str, Future]]:
+        # chamado com self._lock adquirido
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _send(self, batch: List[Tuple[str, Future]]) -> None:
+        if not batch:
+            return
+        try:
+            with timed("llm.batch", pages=len(batch)):
+                outputs = self.corrector.correct_texts([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), output in zip(batch, outputs):
+            future.set_result(output)
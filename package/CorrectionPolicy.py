@@ -0,0 +1,79 @@
+import re
+from typing import Optional
+
+
+# abaixo disso a palavra vai para o LLM com marcador [palavra | conf=...]
+LOW_CONFIDENCE = 0.85
+
+CONF_MARKER_RE = re.compile(r"\[([^\[\]]+?) \| conf=[0-9.]+\]")
+
+
+def confidence_stats(json_dict: dict, threshold: float = LOW_CONFIDENCE) -> dict:
+    """Estatísticas de confiança por página a partir do JSON do OCR."""
+    pages = json_dict.get("pages") or json_dict.get("analyzeResult", {}).get("pages", [])
+    confidences = [
+        word.get("confidence", 0.0)
+        for page in pages
+        for word in page.get("words", [])
+        if word.get("content", "").strip()
+    ]
+    total = len(confidences)
+    low = sum(1 for c in confidences if c < threshold)
+    return {
+        "words": total,
+        "low_confidence_words": low,
+        "low_share": round(low / total, 4) if total else 0.0,
+        "mean_confidence": round(sum(confidences) / total, 4) if total else 0.0,
+    }
+
+
+def strip_confidence_markers(text: str) -> str:
+    """[palavra | conf=0.80] -> palavra"""
+    return CONF_MARKER_RE.sub(r"\1", text)
+
+
+class ConfidencePolicy:
+    """
+    Decide o caminho de correção de uma página pelas estatísticas de confiança:
+
+    - "skip":  OCR limpo, o texto segue sem passar pelo LLM
+    - "cheap": poucos erros prováveis, vai para um modelo mais barato/rápido
+    - "full":  correção normal
+    """
+
+    def __init__(
+        self,
+        skip_min_mean: float = 0.97,
+        skip_max_low_share: float = 0.02,
+        cheap_min_mean: Optional[float] = 0.90,
+        cheap_max_low_share: Optional[float] = 0.10,
+    ):
+        self.skip_min_mean = skip_min_mean
+        self.skip_max_low_share = skip_max_low_share
+        self.cheap_min_mean = cheap_min_mean
+        self.cheap_max_low_share = cheap_max_low_share
+
+    def route(self, stats: dict) -> str:
+        if stats.get("words", 0) == 0:
+            return "skip"  # nada para corrigir
+        mean, low_share = stats["mean_confidence"], stats["low_share"]
+        if mean >= self.skip_min_mean and low_share <= self.skip_max_low_share:
+            return "skip"
+        if (
+            self.cheap_min_mean is not None
+            and self.cheap_max_low_share is not None
+            and mean >= self.cheap_min_mean
+            and low_share <= self.cheap_max_low_share
+        ):
+            return "cheap"
+        return "full"
+
+
+def policy_for_mode(mode: str, gating: str = "off") -> Optional[ConfidencePolicy]:
+    """
+    gating: "off" (padrão: toda página passa pelo LLM) | "on" | "auto" (ligado
+    só para documentos impressos). Pular páginas muda a saída, então é opt-in.
+    """
+    if gating == "on" or (gating == "auto" and mode == "printed"):
+        return ConfidencePolicy()
+    return None
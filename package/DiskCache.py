@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Optional, Union
+
+
+# raiz do repositório (pai de package/)
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CACHE_ROOT = Path(os.getenv("PIPELINE_CACHE_DIR", REPO_ROOT / "cache"))
+
+
+class DiskCache:
+    """
+    Cache persistente de documentos JSON endereçado por conteúdo.
+
+    - chave = sha256 dos pedaços informados (ver make_key)
+    - um arquivo por entrada em <directory>/<ab>/<chave>.json
+    - LRU aproximado: leitura atualiza o mtime; ao passar de max_bytes,
+      remove as entradas mais antigas
+    """
+
+    def __init__(self, directory: Union[str, Path], max_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._total_bytes = sum(p.stat().st_size for p in self._entries())
+
+    @staticmethod
+    def make_key(*parts: Union[str, bytes]) -> str:
+        h = hashlib.sha256()
+        for part in parts:
+            data = part.encode("utf-8") if isinstance(part, str) else part
+            # prefixa o tamanho para ("ab", "c") != ("a", "bc")
+            h.update(len(data).to_bytes(8, "big"))
+            h.update(data)
+        return h.hexdigest()
+
+    @staticmethod
+    def make_file_key(*parts: Union[str, bytes], file_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+        """Igual a make_key(*parts, conteúdo_do_arquivo), mas lendo o arquivo em blocos."""
+        h = hashlib.sha256()
+        for part in parts:
+            data = part.encode("utf-8") if isinstance(part, str) else part
+            h.update(len(data).to_bytes(8, "big"))
+            h.update(data)
+        h.update(os.path.getsize(file_path).to_bytes(8, "big"))
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _entries(self):
+        return self.directory.glob("*/*.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # marca como usado recentemente
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        # escrita atômica: outra thread/processo nunca lê arquivo pela metade
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        old_size = path.stat().st_size if path.exists() else 0
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # chamado com self._lock adquirido
+        entries = []
+        for p in self._entries():
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+
+    def clear(self) -> None:
+        with self._lock:
+            for p in self._entries():
+                p.unlink(missing_ok=True)
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
@@ -1,18 +1,131 @@
 import os
+import time
 from pathlib import Path
-from docx import Document
-from typing import Optional
+from typing import Iterable, Optional
+
+from package.RunMetrics import timed
+
+
+class DocxPageWriter:
+    """
+    Documento montado página a página, com um .partial.docx válido gravado
+    de tempos em tempos: uma queda no meio do lote ainda deixa o que já foi
+    corrigido. close() grava o arquivo final e remove o parcial.
+
+    Custos: o python-docx não grava em modo append, então cada gravação
+    reserializa o documento inteiro (O(páginas)). Por isso o parcial sai por
+    tempo e não por contagem de páginas: no mínimo `flush_interval` segundos
+    entre gravações, e no mínimo `flush_backoff` vezes a duração da última,
+    o que limita o tempo gasto em parciais a ~1/flush_backoff do total em
+    lotes grandes (gravar a cada N páginas seria O(páginas²)). Em troca, uma
+    queda perde até um intervalo de páginas (que o manifesto refaz). A
+    memória não é constante: a árvore XML do documento fica inteira em
+    memória até o close(), crescendo com o texto do lote.
+    """
+
+    def __init__(
+        self,
+        output_path: Path,
+        page_breaks: bool = True,
+        flush_interval: float = 10.0,
+        flush_backoff: float = 10.0,
+    ):
+        self.output_path = Path(output_path)
+        self.partial_path = self.output_path.with_name(f"{self.output_path.stem}.partial{self.output_path.suffix}")
+        self.page_breaks = page_breaks
+        self.flush_interval = flush_interval
+        self.flush_backoff = flush_backoff
+
+        from docx import Document  # python-docx (lxml) só quando um documento é aberto
+
+        self.pages = 0
+        self._doc = Document()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._next_delay = flush_interval
+
+    def add_page(self, text: str) -> None:
+        if self.pages and self.page_breaks:
+            self._doc.add_page_break()  # uma página do Word por imagem de origem
+        elif self.pages:
+            self._doc.add_paragraph("")
+        for line in text.strip().splitlines():
+            self._doc.add_paragraph(line)
+        self.pages += 1
+        self._unflushed += 1
+
+        if time.monotonic() - self._last_flush >= self._next_delay:
+            self.flush()
+
+    def flush(self) -> Optional[Path]:
+        """Grava o documento parcial (escrita atômica); sem páginas novas desde o último, não regrava."""
+        if not self.pages:
+            return None
+        if not self._unflushed:
+            return self.partial_path
+        t0 = time.monotonic()
+        with timed("docx.flush", pages=self.pages):
+            self._save(self.partial_path)
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        # documento maior grava mais devagar: o próximo parcial espera proporcionalmente
+        self._next_delay = max(self.flush_interval, self.flush_backoff * (self._last_flush - t0))
+        return self.partial_path
+
+    def close(self) -> Optional[Path]:
+        """Grava o .docx final; sem páginas, não cria nada (e devolve None)."""
+        if not self.pages:
+            self.partial_path.unlink(missing_ok=True)
+            return None
+        with timed("docx.save", pages=self.pages) as m:
+            self._save(self.output_path)
+            m["bytes"] = self.output_path.stat().st_size
+        self.partial_path.unlink(missing_ok=True)
+        return self.output_path
+
+    def _save(self, path: Path) -> None:
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        self._doc.save(tmp)
+        os.replace(tmp, path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.flush()  # deixa o parcial para inspeção
+
 
 class DocxExporter:
-    def __init__(self, output_dir: str = "output"):
+    def __init__(self, output_dir: str = "output", page_breaks: bool = True, flush_interval: float = 10.0):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.page_breaks = page_breaks
+        self.flush_interval = flush_interval
+
+    def open_document(self, filename: str) -> DocxPageWriter:
+        """Documento incremental: add_page(texto) por imagem de origem, depois close()."""
+        return DocxPageWriter(self.output_dir / filename, page_breaks=self.page_breaks, flush_interval=self.flush_interval)
+
+    def save_pages_to_docx(self, pages: Iterable[str], filename: str = "documento_corrigido.docx") -> Optional[Path]:
+        """Consome as páginas de um iterador sem juntá-las numa string única."""
+        with self.open_document(filename) as writer:
+            for text in pages:
+                writer.add_page(text)
+        return writer.output_path if writer.pages else None
 
     def save_text_to_docx(self, text: str, filename: Optional[str] = "documento_corrigido.docx") -> Path:
-        doc = Document()
-        for line in text.strip().splitlines():
-            doc.add_paragraph(line)
+        from docx import Document
+
+        with timed("docx.build", chars=len(text)):
+            doc = Document()
+            for line in text.strip().splitlines():
+                doc.add_paragraph(line)
 
         output_path = self.output_dir / filename
-        doc.save(output_path)
-        return output_path
\ No newline at end of file
+        with timed("docx.save") as m:
+            doc.save(output_path)
+            m["bytes"] = output_path.stat().st_size
+        return output_path
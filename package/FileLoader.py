@@ -10,20 +10,23 @@ class FileLoader:
         if not self.directory.exists():
             raise FileNotFoundError(f"Diretório '{self.directory}' não encontrado.")
 
+    def _entries(self) -> List[os.DirEntry]:
+        # scandir: tipo e stat vêm da própria listagem (DirEntry guarda o stat)
+        with os.scandir(self.directory) as it:
+            return [e for e in it if e.is_file() and Path(e.name).suffix.lower() in self.allowed_extensions]
+
     def list_files(self) -> List[Path]:
-        return [
-            f for f in self.directory.iterdir()
-            if f.is_file() and f.suffix.lower() in self.allowed_extensions
-        ]
+        return [self.directory / e.name for e in self._entries()]
 
     def list_files_sorted_by_metadata(self, sort_by: Literal["mtime", "size", "name"] = "mtime", reverse: bool = False) -> List[Path]:
-        files = self.list_files()
+        entries = self._entries()
 
         if sort_by == "mtime":
-            return sorted(files, key=lambda f: f.stat().st_mtime, reverse=reverse)
+            entries.sort(key=lambda e: e.stat().st_mtime_ns, reverse=reverse)
         elif sort_by == "size":
-            return sorted(files, key=lambda f: f.stat().st_size, reverse=reverse)
+            entries.sort(key=lambda e: e.stat().st_size, reverse=reverse)
         elif sort_by == "name":
-            return sorted(files, key=lambda f: f.name, reverse=reverse)
+            entries.sort(key=lambda e: e.name, reverse=reverse)
         else:
-            raise ValueError("Opção inválida. Use 'mtime', 'size' ou 'name'.")
\ No newline at end of file
+            raise ValueError("Opção inválida. Use 'mtime', 'size' ou 'name'.")
+        return [self.directory / e.name for e in entries]
\ No newline at end of file
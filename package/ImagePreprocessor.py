@@ -0,0 +1,203 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from package.DiskCache import DiskCache, CACHE_ROOT
+from package.RunMetrics import record
+
+
+# formatos que o PIL abre e que vale reduzir (PDF vai como está)
+PREPROCESS_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    # prebuilt-read não ganha nada acima de ~200 DPI: A4 a 200 DPI tem ~2340 px no lado maior
+    max_long_edge: int = 2400
+    grayscale: bool = True
+    exif_transpose: bool = True
+    jpeg_quality: int = 80
+
+    def signature(self) -> str:
+        return "preprocess-v1:" + ",".join(f"{k}={v}" for k, v in sorted(asdict(self).items()))
+
+
+def preprocess_to_cache(src: str, cache_dir: str, options: PreprocessOptions) -> dict:
+    """
+    Roda no processo filho: gira pelo EXIF, reduz, converte para cinza e
+    recomprime em JPEG dentro de cache_dir (endereçado pelo conteúdo + opções).
+    Se a saída já existir, só devolve o caminho.
+    """
+    from PIL import Image, ImageOps
+
+    t0 = time.perf_counter()
+    bytes_in = os.path.getsize(src)
+    key = DiskCache.make_file_key(options.signature(), file_path=src)
+    out = Path(cache_dir) / key[:2] / f"{key}.jpg"
+    if out.exists():
+        os.utime(out)  # LRU, como no DiskCache
+        return {"path": str(out), "cached": True, "bytes_in": bytes_in, "bytes_out": out.stat().st_size,
+                "seconds": time.perf_counter() - t0}
+
+    with Image.open(src) as img:
+        size_in = img.size
+        if options.exif_transpose:
+            img = ImageOps.exif_transpose(img)
+        img = img.convert("L" if options.grayscale else "RGB")
+        if max(img.size) > options.max_long_edge:
+            img.thumbnail((options.max_long_edge, options.max_long_edge), Image.Resampling.LANCZOS)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_suffix(f".{os.getpid()}.tmp")
+        img.save(tmp, format="JPEG", quality=options.jpeg_quality, optimize=True)
+        size_out = img.size
+    os.replace(tmp, out)
+
+    return {
+        "path": str(out), "cached": False, "bytes_in": bytes_in, "bytes_out": out.stat().st_size,
+        "size_in": size_in, "size_out": size_out, "seconds": time.perf_counter() - t0,
+    }
+
+
+class ImagePreprocessor:
+    """
+    Reduz as imagens antes do OCR num pool de processos (PIL segura o GIL
+    em boa parte da decodificação/recompressão). A saída fica em cache por
+    conteúdo + opções, então reexecuções não recodificam nada. A imagem
+    original em images/<lote>/ não é alterada.
+    """
+
+    def __init__(
+        self,
+        options: Optional[PreprocessOptions] = None,
+        cache_dir: Union[str, Path, None] = None,
+        max_workers: Optional[int] = None,
+        max_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.options = options or PreprocessOptions()
+        self.cache_dir = Path(cache_dir) if cache_dir else CACHE_ROOT / "preprocess"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.max_bytes = int(max_bytes)
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # memo por (caminho, tamanho, mtime): reenvio com o mesmo nome não reaproveita a saída antiga
+        self._futures: Dict[tuple, Future] = {}
+        self._accounted: set = set()
+        self._new_since_evict = 0
+        self._lock = threading.Lock()
+
+        self.files = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    @staticmethod
+    def supports(path: Union[str, Path]) -> bool:
+        return Path(path).suffix.lower() in PREPROCESS_EXTENSIONS
+
+    def submit(self, paths: Iterable[Union[str, Path]]) -> None:
+        """Agenda as imagens no pool (o pipeline chama antes do OCR para adiantar o trabalho)."""
+        for path in paths:
+            if self.supports(path):
+                self._future_for(str(path))
+
+    def path_for(self, path: Union[str, Path]) -> str:
+        """Caminho da versão reduzida; se não der para processar, o próprio original."""
+        path = str(path)
+        if not self.supports(path):
+            return path
+        future = None
+        try:
+            future = self._future_for(path)
+            info = future.result()
+        except Exception:
+            with self._lock:
+                # a mesma falha consultada de novo (ex.: chave de cache do manifesto) conta uma vez
+                if future is None or id(future) not in self._accounted:
+                    if future is not None:
+                        self._accounted.add(id(future))
+                    self.failures += 1
+            return path
+
+        if not os.path.exists(info["path"]):
+            # saída removida pela limpeza do cache depois de memorizada: refaz
+            with self._lock:
+                self._futures = {k: f for k, f in self._futures.items() if f is not future}
+            return self.path_for(path)
+
+        with self._lock:
+            first = id(future) not in self._accounted
+            if first:
+                self._accounted.add(id(future))
+                self.files += 1
+                self.cache_hits += int(info["cached"])
+                self.bytes_in += info["bytes_in"]
+                self.bytes_out += info["bytes_out"]
+                self.seconds += info["seconds"]
+                self._new_since_evict += int(not info["cached"])
+                evict = self._new_since_evict >= 200
+                if evict:
+                    self._new_since_evict = 0
+        if first:
+            record("preprocess", info["seconds"], bytes_in=info["bytes_in"], bytes_out=info["bytes_out"],
+                   cached=int(info["cached"]))
+            if evict:
+                self._evict()
+        # reduzir não compensou (ex.: JPEG já pequeno): manda o original
+        return info["path"] if info["bytes_out"] < info["bytes_in"] else path
+
+    def _future_for(self, path: str) -> Future:
+        st = os.stat(path)
+        memo_key = (path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            future = self._futures.get(memo_key)
+            if future is None:
+                if self._pool is None:
+                    # spawn: o app/pipeline tem threads rodando, fork não é seguro
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                future = self._pool.submit(preprocess_to_cache, path, str(self.cache_dir), self.options)
+                self._futures[memo_key] = future
+            return future
+
+    def _evict(self) -> None:
+        entries = []
+        for p in self.cache_dir.glob("*/*.jpg"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            saved = self.bytes_in - self.bytes_out
+            return {
+                "files": self.files,
+                "cache_hits": self.cache_hits,
+                "failures": self.failures,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "saved_pct": round(100.0 * saved / self.bytes_in, 1) if self.bytes_in else 0.0,
+                "seconds": round(self.seconds, 3),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
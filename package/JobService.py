@@ -0,0 +1,188 @@
+import uuid
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from package.CorrectionPolicy import policy_for_mode
+from package.DocxExporter import DocxExporter
+from package.PipelineRunner import PipelineRunner
+
+
+@dataclass(frozen=True)
+class JobRequest:
+    lote: str
+    base_dir: str                 # raiz dos lotes (images/)
+    output_dir: str
+    mode: str = "printed"         # "printed" | "handwritten"
+    lang: str = "por"             # "por" | "eng" | "spa" | "fra"
+    order_by: str = "name"
+    force_ocr: bool = False
+    gating: str = "off"           # política de confiança: "off" | "on" | "auto" (ver policy_for_mode)
+
+
+@dataclass
+class Job:
+    id: str
+    request: JobRequest
+    status: str = "queued"        # queued | running | done | failed
+    submitted_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    logs: deque = field(default_factory=lambda: deque(maxlen=2000))
+    summary: Optional[dict] = None
+    error: Optional[str] = None
+    progress: Optional[dict] = None   # último evento do ProgressTracker
+
+    @property
+    def returncode(self) -> Optional[int]:
+        if self.status == "done":
+            return 0
+        if self.status == "failed":
+            return 1
+        return None
+
+    def snapshot(self, log_tail: int = 80) -> dict:
+        logs = list(self.logs)
+        return {
+            "id": self.id,
+            "lote": self.request.lote,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "summary": self.summary,
+            "progress": self.progress,
+            "error": self.error,
+            "returncode": self.returncode,
+            "log_lines": len(logs),
+            "log_tail": logs[-log_tail:] if log_tail > 0 else [],
+        }
+
+
+class JobService:
+    """
+    Executor de jobs de longa duração dentro do processo do app: substitui o
+    subprocess por clique. Mantém clientes de OCR/correção "quentes" (um por
+    locale / por modo+idioma), aceita lotes de várias sessões ao mesmo tempo
+    e deixa a UI consultar o status sem bloquear.
+    """
+
+    def __init__(
+        self,
+        ocr_factory: Callable[[str], Any],                  # lang -> cliente de OCR
+        corrector_factory: Callable[[str, str], Any],       # (mode, lang) -> corretor
+        max_concurrent_jobs: int = 2,
+        runner_options: Optional[dict] = None,              # repassado ao PipelineRunner
+        max_finished_jobs: int = 200,
+    ):
+        self.ocr_factory = ocr_factory
+        self.corrector_factory = corrector_factory
+        self.runner_options = dict(runner_options or {})
+        self.max_finished_jobs = max_finished_jobs
+
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_concurrent_jobs)), thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._ocr_clients: Dict[str, Any] = {}
+        self._correctors: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    # --- API ---
+    def submit(self, request: JobRequest) -> str:
+        """Enfileira o lote; se já houver job ativo para ele, devolve o id existente."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.request.lote == request.lote and job.status in ("queued", "running"):
+                    return job.id
+            job = Job(id=uuid.uuid4().hex[:12], request=request)
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._execute, job)
+        return job.id
+
+    def get(self, job_id: str, log_tail: int = 80) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.snapshot(log_tail) if job else None
+
+    def logs(self, job_id: str) -> List[str]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return list(job.logs) if job else []
+
+    def active_job_for(self, lote: str) -> Optional[str]:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.request.lote == lote and job.status in ("queued", "running"):
+                    return job.id
+        return None
+
+    def list_jobs(self) -> List[dict]:
+        with self._lock:
+            return [job.snapshot(log_tail=0) for job in self._jobs.values()]
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    # --- execução ---
+    def _execute(self, job: Job) -> None:
+        req = job.request
+        with self._lock:
+            job.status = "running"
+            job.started_at = datetime.now().isoformat(timespec="seconds")
+
+        def log(message: str) -> None:
+            with self._lock:
+                job.logs.append(str(message))
+
+        def on_event(event: dict) -> None:
+            with self._lock:
+                job.progress = event
+
+        options = {"correction_policy": policy_for_mode(req.mode, req.gating), **self.runner_options}
+        try:
+            runner = PipelineRunner(
+                self._ocr_for(req.lang),
+                self._corrector_for(req.mode, req.lang),
+                DocxExporter(req.output_dir),
+                base_dir=req.base_dir,
+                output_dir=req.output_dir,
+                order_by=req.order_by,
+                log=log,
+                on_event=on_event,
+                **options,
+            )
+            summary = runner.run(force_ocr=req.force_ocr, lotes=[req.lote])
+            with self._lock:
+                job.summary = summary
+                job.status = "failed" if summary.get("failed") else "done"
+        except Exception as e:
+            log(traceback.format_exc())
+            with self._lock:
+                job.error = str(e)
+                job.status = "failed"
+        finally:
+            with self._lock:
+                job.finished_at = datetime.now().isoformat(timespec="seconds")
+
+    def _ocr_for(self, lang: str) -> Any:
+        with self._lock:
+            if lang not in self._ocr_clients:
+                self._ocr_clients[lang] = self.ocr_factory(lang)
+            return self._ocr_clients[lang]
+
+    def _corrector_for(self, mode: str, lang: str) -> Any:
+        with self._lock:
+            key = (mode, lang)
+            if key not in self._correctors:
+                self._correctors[key] = self.corrector_factory(mode, lang)
+            return self._correctors[key]
+
+    def _prune(self) -> None:
+        # chamado com self._lock adquirido: descarta os jobs terminados mais antigos
+        finished = [j for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            self._jobs.pop(job.id, None)
@@ -0,0 +1,304 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from package.DiskCache import CACHE_ROOT
+
+
+PAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".pdf"}
+NAT_RE = re.compile(r"\d+|\D+")
+ORDER_COLUMNS = {"name": "position", "mtime": "mtime_ns", "ctime": "ctime_ns"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lotes (
+    name TEXT PRIMARY KEY,
+    dir_mtime_ns INTEGER,          -- mtime da pasta no último sync (NULL = sincronizar)
+    created TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    lote TEXT NOT NULL,
+    file TEXT NOT NULL,
+    position INTEGER NOT NULL,     -- ordem natural do nome (001_, 2 antes de 10)
+    size INTEGER, mtime_ns INTEGER, ctime_ns INTEGER, ino INTEGER,
+    input_hash TEXT,               -- hash do LoteManifest, gravado pelas execuções
+    status TEXT NOT NULL DEFAULT 'new',   -- new | queued | done | failed
+    error TEXT,
+    updated TEXT,
+    PRIMARY KEY (lote, file)
+);
+CREATE INDEX IF NOT EXISTS pages_order ON pages (lote, position);
+CREATE INDEX IF NOT EXISTS pages_hash ON pages (input_hash);
+CREATE TABLE IF NOT EXISTS outputs (
+    path TEXT PRIMARY KEY,
+    lote TEXT NOT NULL,
+    size INTEGER, mtime_ns INTEGER,
+    created TEXT
+);
+CREATE INDEX IF NOT EXISTS outputs_lote ON outputs (lote);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def natural_key(name: str) -> list:
+    # tuplas (tipo, valor): "a1" x "1a" não compara str com int
+    return [(0, int(t)) if t.isdigit() else (1, t.lower()) for t in NAT_RE.findall(name)]
+
+
+def default_catalog_path(images_dir: Union[str, Path]) -> Path:
+    # fora de images/ (a limpeza do modo público apaga a pasta inteira); um banco por raiz
+    root = str(Path(images_dir).resolve())
+    return CACHE_ROOT / "catalog" / f"{hashlib.sha256(root.encode('utf-8')).hexdigest()[:16]}.sqlite3"
+
+
+class LoteCatalog:
+    """
+    Índice SQLite de images/<lote>/: lotes, páginas (ordem, tamanho, mtime,
+    hash, status) e saídas geradas. Listar é uma consulta; a pasta só é
+    relida quando o mtime dela muda (upload, renomeação, remoção), então um
+    rerun custa um stat por lote em vez de um stat por arquivo. Upload,
+    ordem, renomeação e execuções atualizam o índice diretamente.
+    """
+
+    def __init__(
+        self,
+        images_dir: Union[str, Path],
+        output_dir: Union[str, Path, None] = None,
+        db_path: Union[str, Path, None] = None,
+    ):
+        self.images_dir = Path(images_dir)
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.db_path = Path(db_path) if db_path else default_catalog_path(self.images_dir)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # uma conexão por catálogo, serializada pelo lock (workers do pipeline + script do app)
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.RLock()
+
+    # --- lotes ---
+    def lotes(self) -> List[str]:
+        self.sync_lotes()
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT name FROM lotes ORDER BY name")]
+
+    def sync_lotes(self, force: bool = False) -> None:
+        """Relê as subpastas de images/ só se o mtime da raiz mudou."""
+        try:
+            mtime_ns = self.images_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'root_mtime_ns'").fetchone()
+            if not force and row is not None and mtime_ns is not None and row[0] == str(mtime_ns):
+                return
+            names = set()
+            if mtime_ns is not None:
+                with os.scandir(self.images_dir) as it:
+                    names = {e.name for e in it if e.is_dir() and not e.name.startswith(".")}
+            known = {r[0] for r in self._db.execute("SELECT name FROM lotes")}
+            now = _now()
+            with self._db:
+                self._db.executemany("INSERT INTO lotes (name, dir_mtime_ns, created) VALUES (?, NULL, ?)",
+                                     [(n, now) for n in names - known])
+                for name in known - names:
+                    self._drop_pages(name)
+                self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('root_mtime_ns', ?)",
+                                 (str(mtime_ns),))
+
+    def rename_lote(self, old: str, new: str) -> None:
+        """Depois de renomear a pasta: páginas (com hash/status) e saídas passam para o novo nome."""
+        with self._lock, self._db:
+            self._drop_pages(new)
+            self._db.execute("UPDATE lotes SET name = ? WHERE name = ?", (new, old))
+            self._db.execute("UPDATE pages SET lote = ? WHERE lote = ?", (new, old))
+            self._db.execute("UPDATE outputs SET lote = ? WHERE lote = ?", (new, old))
+            self._db.execute("DELETE FROM meta WHERE key = 'root_mtime_ns'")
+
+    def delete_lote(self, lote: str) -> None:
+        """Lote apagado de images/ (as saídas continuam registradas, como os arquivos em output/)."""
+        with self._lock, self._db:
+            self._drop_pages(lote)
+            self._db.execute("DELETE FROM meta WHERE key = 'root_mtime_ns'")
+
+    def reset(self, outputs: bool = False) -> None:
+        """images/ apagada por inteiro (limpeza do modo público); outputs=True esquece também as saídas."""
+        tables = ("lotes", "pages", "meta") + (("outputs",) if outputs else ())
+        with self._lock, self._db:
+            for table in tables:
+                self._db.execute(f"DELETE FROM {table}")
+
+    # --- páginas ---
+    def pages(
+        self,
+        lote: str,
+        order_by: str = "name",
+        extensions: Optional[Iterable[str]] = None,
+    ) -> List[Path]:
+        """Páginas do lote na ordem pedida (name | mtime | ctime), sem varrer a pasta."""
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"order_by inválido: {order_by!r} (use {', '.join(ORDER_COLUMNS)})")
+        self.sync_lote(lote)
+        exts = {e.lower() for e in extensions} if extensions else None
+        folder = self.images_dir / lote
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT file FROM pages WHERE lote = ? ORDER BY {ORDER_COLUMNS[order_by]}, position", (lote,)
+            ).fetchall()
+        return [folder / f for (f,) in rows if exts is None or Path(f).suffix.lower() in exts]
+
+    def page_rows(self, lote: str) -> List[dict]:
+        self.sync_lote(lote)
+        with self._lock:
+            cur = self._db.execute(
+                "SELECT file, position, size, input_hash, status, error, updated FROM pages WHERE lote = ? ORDER BY position",
+                (lote,),
+            )
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    def status_counts(self, lote: str) -> Dict[str, int]:
+        self.sync_lote(lote)
+        with self._lock:
+            return dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM pages WHERE lote = ? GROUP BY status", (lote,)
+            ).fetchall())
+
+    def sync_lote(self, lote: str, force: bool = False) -> None:
+        """
+        Relê images/<lote>/ se o mtime da pasta mudou (ou force). Hash/status
+        seguem o arquivo em renomeações (mesmo inode, tamanho e mtime).
+        O mtime também muda com o que a execução grava na pasta (manifesto,
+        .corrigido/, sidecars de OCR): se as páginas listadas têm os mesmos
+        nome, inode, tamanho e mtime já registrados, só o mtime da pasta é
+        atualizado (as linhas, com hash/status, ficam como estão).
+        """
+        folder = self.images_dir / lote
+        try:
+            dir_mtime_ns = folder.stat().st_mtime_ns
+        except FileNotFoundError:
+            with self._lock, self._db:
+                self._drop_pages(lote)
+            return
+        with self._lock:
+            row = self._db.execute("SELECT dir_mtime_ns FROM lotes WHERE name = ?", (lote,)).fetchone()
+            if not force and row is not None and row[0] == dir_mtime_ns:
+                return
+
+            with os.scandir(folder) as it:
+                listing = [
+                    e for e in it
+                    if not e.name.startswith(("__tmp__", ".")) and Path(e.name).suffix.lower() in PAGE_EXTENSIONS
+                ]
+
+            entries = []
+            for e in listing:
+                try:
+                    if not e.is_file():
+                        continue
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((e.name, st))
+            entries.sort(key=lambda item: natural_key(item[0]))
+
+            old = self._db.execute(
+                "SELECT file, size, mtime_ns, ino, input_hash, status, error, updated FROM pages WHERE lote = ?", (lote,)
+            ).fetchall()
+            current = {(name, st.st_ino, st.st_size, st.st_mtime_ns) for name, st in entries}
+            if not force and row is not None and current == {(r[0], r[3], r[1], r[2]) for r in old}:
+                # nenhuma página entrou, saiu ou foi regravada: a mudança foi só de artefatos da execução
+                with self._db:
+                    self._db.execute("UPDATE lotes SET dir_mtime_ns = ? WHERE name = ?", (dir_mtime_ns, lote))
+                return
+            by_name = {r[0]: r for r in old}
+            by_ino = {r[3]: r for r in old if r[3]}
+
+            rows = []
+            for position, (name, st) in enumerate(entries):
+                prev = by_name.get(name)
+                if prev is None or prev[3] != st.st_ino:
+                    prev = by_ino.get(st.st_ino)  # renomeado (ex.: prefixos do "Aplicar ordem")
+                if prev is not None and (prev[1], prev[2]) != (st.st_size, st.st_mtime_ns):
+                    prev = None  # conteúdo mudou: hash/status não valem mais
+                input_hash, status, error, updated = prev[4:] if prev else (None, "new", None, _now())
+                rows.append((lote, name, position, st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino,
+                             input_hash, status, error, updated))
+
+            with self._db:
+                self._db.execute("DELETE FROM pages WHERE lote = ?", (lote,))
+                self._db.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._db.execute(
+                    "INSERT INTO lotes (name, dir_mtime_ns, created) VALUES (?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET dir_mtime_ns = excluded.dir_mtime_ns",
+                    (lote, dir_mtime_ns, _now()),
+                )
+
+    def set_status(self, lote: str, file: str, status: str, error: Optional[str] = None,
+                   input_hash: Optional[str] = None) -> None:
+        self.set_statuses(lote, [(file, status, error, input_hash)])
+
+    def set_statuses(self, lote: str, updates: Iterable[Tuple[str, str, Optional[str], Optional[str]]]) -> None:
+        """(arquivo, status, erro, input_hash) em uma transação; input_hash None mantém o atual."""
+        now = _now()
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE pages SET status = ?, error = ?, input_hash = COALESCE(?, input_hash), updated = ? "
+                "WHERE lote = ? AND file = ?",
+                [(status, error, input_hash, now, lote, name) for name, status, error, input_hash in updates],
+            )
+
+    def find_by_hash(self, input_hash: str) -> List[Tuple[str, str]]:
+        """(lote, arquivo) com o mesmo conteúdo já visto por alguma execução."""
+        with self._lock:
+            return self._db.execute("SELECT lote, file FROM pages WHERE input_hash = ?", (input_hash,)).fetchall()
+
+    # --- saídas ---
+    def add_output(self, lote: str, path: Union[str, Path]) -> None:
+        path = Path(path).resolve()
+        st = path.stat()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO outputs (path, lote, size, mtime_ns, created) VALUES (?, ?, ?, ?, ?)",
+                (str(path), lote, st.st_size, st.st_mtime_ns, _now()),
+            )
+
+    def outputs(self, lote: str) -> List[Path]:
+        """
+        Saídas registradas do lote (as que sumiram do disco saem do índice).
+        Saída antiga, de antes do catálogo, entra se tiver o nome exato <lote>.docx.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT path FROM outputs WHERE lote = ? ORDER BY path", (lote,)).fetchall()
+        paths = [Path(p) for (p,) in rows]
+        missing = [p for p in paths if not p.exists()]
+        if missing:
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM outputs WHERE path = ?", [(str(p),) for p in missing])
+        paths = [p for p in paths if p not in missing]
+        if not paths and self.output_dir is not None:
+            legacy = self.output_dir / f"{lote}.docx"
+            if legacy.is_file():
+                self.add_output(lote, legacy)
+                paths = [legacy.resolve()]
+        return paths
+
+    # --- internos ---
+    def _drop_pages(self, lote: str) -> None:
+        # chamado com o lock e dentro de uma transação
+        self._db.execute("DELETE FROM pages WHERE lote = ?", (lote,))
+        self._db.execute("DELETE FROM lotes WHERE name = ?", (lote,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
@@ -0,0 +1,152 @@
+import os
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+from package.DiskCache import DiskCache
+
+
+class LoteManifest:
+    """
+    Manifesto por lote (images/<lote>/.manifest.json) para reprocessamento
+    incremental. Cada página é identificada pelo hash do conteúdo, então
+    renomear/reordenar (apply_prefix_order) não invalida o que já foi feito.
+
+    Guarda por página: hash de entrada, chave do cache de OCR, arquivo com o
+    texto corrigido (.corrigido/<hash>.txt), assinatura da correção e status.
+    Por documento exportado: a lista ordenada de hashes que entrou nele (se a
+    ordem ou o conjunto de páginas mudar, o .docx é remontado).
+    """
+
+    FILENAME = ".manifest.json"
+    ARTIFACTS_DIR = ".corrigido"
+    VERSION = 1
+
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+        self.path = self.folder / self.FILENAME
+        self.artifacts_dir = self.folder / self.ARTIFACTS_DIR
+        self._lock = threading.Lock()
+        self.data = self._load()
+        # nomes cujo conteúdo mudou desde a última execução (sidecars de OCR ao lado deles são do conteúdo antigo)
+        self.replaced: set = set()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                return data
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return {"version": self.VERSION, "lote": self.folder.name, "pages": {}, "files": {}, "exports": {}}
+
+    def input_hash(self, image: Path) -> str:
+        """Hash do conteúdo, reaproveitado enquanto nome/tamanho/mtime não mudarem."""
+        st = image.stat()
+        with self._lock:
+            memo = self.data["files"].get(image.name)
+        if memo and memo["size"] == st.st_size and memo["mtime_ns"] == st.st_mtime_ns:
+            return memo["hash"]
+
+        digest = DiskCache.make_file_key(file_path=image)
+        with self._lock:
+            if memo and memo["hash"] != digest:
+                self.replaced.add(image.name)
+            self.data["files"][image.name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+        return digest
+
+    def is_done(self, input_hash: str, signature: str = "") -> bool:
+        with self._lock:
+            entry = self.data["pages"].get(input_hash)
+        return bool(
+            entry
+            and entry.get("status") == "done"
+            and entry.get("signature", "") == signature
+            and (self.folder / entry.get("corrected", "")).is_file()
+        )
+
+    def corrected_text(self, input_hash: str) -> Optional[str]:
+        with self._lock:
+            entry = self.data["pages"].get(input_hash)
+        if not entry or not entry.get("corrected"):
+            return None
+        try:
+            return (self.folder / entry["corrected"]).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def mark_done(
+        self,
+        input_hash: str,
+        file_name: str,
+        corrected: str,
+        signature: str = "",
+        ocr_cache_key: Optional[str] = None,
+        route: Optional[str] = None,
+    ) -> None:
+        self.artifacts_dir.mkdir(parents=True, exist_ok=True)
+        artifact = self.artifacts_dir / f"{input_hash}.txt"
+        tmp = artifact.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_text(corrected, encoding="utf-8")
+        os.replace(tmp, artifact)
+
+        self._update(input_hash, {
+            "file": file_name,
+            "status": "done",
+            "corrected": f"{self.ARTIFACTS_DIR}/{artifact.name}",
+            "signature": signature,
+            "ocr_cache_key": ocr_cache_key,
+            "route": route,
+            "error": None,
+        })
+
+    def mark_failed(self, input_hash: str, file_name: str, error: str, ocr_cache_key: Optional[str] = None) -> None:
+        self._update(input_hash, {
+            "file": file_name,
+            "status": "failed",
+            "ocr_cache_key": ocr_cache_key,
+            "error": error,
+        })
+
+    def exported_pages(self, output_name: str) -> Optional[list]:
+        """Hashes, na ordem, das páginas do último `output_name` gravado (None = desconhecido)."""
+        with self._lock:
+            entry = self.data.get("exports", {}).get(output_name)
+        return list(entry["pages"]) if entry else None
+
+    def mark_exported(self, output_name: str, page_hashes: Iterable[str]) -> None:
+        with self._lock:
+            self.data.setdefault("exports", {})[output_name] = {
+                "pages": list(page_hashes),
+                "updated": datetime.now().isoformat(timespec="seconds"),
+            }
+        self.save()
+
+    def _update(self, input_hash: str, fields: dict) -> None:
+        with self._lock:
+            entry = self.data["pages"].setdefault(input_hash, {})
+            entry.update(fields, updated=datetime.now().isoformat(timespec="seconds"))
+        # grava a cada página: um crash no meio do lote não perde o que já terminou
+        self.save()
+
+    def prune(self, keep_hashes: Iterable[str], keep_files: Iterable[str]) -> None:
+        """Remove páginas/arquivos que não estão mais no lote."""
+        keep_hashes, keep_files = set(keep_hashes), set(keep_files)
+        with self._lock:
+            for h in [h for h in self.data["pages"] if h not in keep_hashes]:
+                entry = self.data["pages"].pop(h)
+                if entry.get("corrected"):
+                    (self.folder / entry["corrected"]).unlink(missing_ok=True)
+            for name in [n for n in self.data["files"] if n not in keep_files]:
+                self.data["files"].pop(name)
+        self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            payload = json.dumps(self.data, ensure_ascii=False, indent=2)
+            tmp = self.path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
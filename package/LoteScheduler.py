@@ -0,0 +1,73 @@
+import threading
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# fifo: lote a lote, na ordem das pastas (comportamento antigo)
+# round_robin: reveza páginas entre os lotes (fair share)
+# small_first: lotes com menos páginas pendentes primeiro
+SCHEDULE_POLICIES = ("round_robin", "small_first", "fifo")
+
+
+def schedule(
+    groups: Dict[Hashable, Sequence[T]],
+    policy: str = "round_robin",
+    priorities: Optional[Dict[Hashable, int]] = None,
+    quantum: int = 1,
+) -> List[T]:
+    """
+    Ordena os itens de vários lotes numa única fila. Todos dividem o mesmo
+    orçamento de workers; a ordem decide quem anda primeiro. Lotes com
+    prioridade maior vão antes; dentro de uma prioridade vale a política.
+    `quantum` = páginas seguidas de um lote por vez no round_robin (ex.: o
+    tamanho do lote multipágina do OCR, para não quebrar os grupos).
+    """
+    if policy not in SCHEDULE_POLICIES:
+        raise ValueError(f"Política inválida: {policy!r} (use {', '.join(SCHEDULE_POLICIES)})")
+    priorities = priorities or {}
+    quantum = max(1, int(quantum))
+
+    order = list(groups)  # ordem de descoberta das pastas
+    by_priority: Dict[int, List[Hashable]] = {}
+    for key in order:
+        by_priority.setdefault(priorities.get(key, 0), []).append(key)
+
+    out: List[T] = []
+    for priority in sorted(by_priority, reverse=True):
+        keys = by_priority[priority]
+        if policy == "small_first":
+            keys = sorted(keys, key=lambda k: len(groups[k]))  # sort estável: empate mantém a ordem
+        if policy in ("fifo", "small_first"):
+            for key in keys:
+                out.extend(groups[key])
+            continue
+        # round_robin
+        cursors = {key: 0 for key in keys}
+        while cursors:
+            for key in list(cursors):
+                start = cursors[key]
+                out.extend(groups[key][start:start + quantum])
+                if start + quantum >= len(groups[key]):
+                    del cursors[key]
+                else:
+                    cursors[key] = start + quantum
+    return out
+
+
+class CompletionTracker:
+    """
+    Conta as páginas pendentes de cada lote e chama on_complete(lote) assim
+    que a última termina (com sucesso ou falha), para o .docx sair na hora.
+    """
+
+    def __init__(self, pending: Dict[Hashable, int], on_complete: Callable[[Hashable], None]):
+        self._pending = dict(pending)
+        self._on_complete = on_complete
+        self._lock = threading.Lock()
+
+    def done(self, key: Hashable) -> None:
+        with self._lock:
+            self._pending[key] -= 1
+            finished = self._pending[key] == 0
+        if finished:
+            self._on_complete(key)
@@ -0,0 +1,85 @@
+import io
+import copy
+from typing import List, Sequence
+
+
+# pacotes multipágina aceitam só imagens; PDFs seguem página a página
+BATCHABLE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+
+def pack_images(images: Sequence[bytes], fmt: str = "pdf") -> bytes:
+    """Junta várias imagens num único documento multipágina (PDF ou TIFF), uma imagem por página."""
+    # pillow só é necessário quando há envio multipágina
+    from PIL import Image
+
+    frames = [Image.open(io.BytesIO(data)).convert("RGB") for data in images]
+    if not frames:
+        raise ValueError("Nenhuma imagem para empacotar.")
+
+    buf = io.BytesIO()
+    if fmt == "pdf":
+        frames[0].save(buf, format="PDF", save_all=True, append_images=frames[1:], resolution=300.0)
+    elif fmt == "tiff":
+        frames[0].save(buf, format="TIFF", save_all=True, append_images=frames[1:], compression="tiff_deflate")
+    else:
+        raise ValueError("Formato inválido. Use 'pdf' ou 'tiff'.")
+    return buf.getvalue()
+
+
+def _rebase(node, offset: int):
+    """Desloca offsets de span e renumera boundingRegions para a página 1."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "span" and isinstance(value, dict) and "offset" in value:
+                value["offset"] -= offset
+            elif key == "spans" and isinstance(value, list):
+                for span in value:
+                    if isinstance(span, dict) and "offset" in span:
+                        span["offset"] -= offset
+            elif key == "boundingRegions" and isinstance(value, list):
+                for region in value:
+                    if isinstance(region, dict):
+                        region["pageNumber"] = 1
+            else:
+                _rebase(value, offset)
+    elif isinstance(node, list):
+        for item in node:
+            _rebase(item, offset)
+    return node
+
+
+def split_analyze_result(result: dict, expected_pages: int) -> List[dict]:
+    """
+    Divide o analyzeResult de um documento multipágina em um resultado por
+    página, no mesmo formato de uma análise avulsa (pageNumber=1, content e
+    spans relativos à página), para que sidecars e cache continuem por imagem.
+    """
+    pages = sorted(result.get("pages", []), key=lambda p: p.get("pageNumber", 0))
+    if len(pages) != expected_pages:
+        raise ValueError(f"Esperava {expected_pages} página(s), Azure devolveu {len(pages)}.")
+
+    content = result.get("content", "")
+    per_page_keys = {"pages", "content", "paragraphs", "styles", "languages"}
+    out = []
+    for page in pages:
+        number = page.get("pageNumber")
+        spans = page.get("spans") or []
+        start = min((s["offset"] for s in spans), default=0)
+        end = max((s["offset"] + s["length"] for s in spans), default=start)
+
+        page_copy = _rebase(copy.deepcopy(page), start)
+        page_copy["pageNumber"] = 1
+
+        item = {k: copy.deepcopy(v) for k, v in result.items() if k not in per_page_keys}
+        item["content"] = content[start:end]
+        item["pages"] = [page_copy]
+
+        paragraphs = [
+            _rebase(copy.deepcopy(p), start)
+            for p in result.get("paragraphs", [])
+            if any(r.get("pageNumber") == number for r in p.get("boundingRegions", []))
+        ]
+        if paragraphs:
+            item["paragraphs"] = paragraphs
+        out.append(item)
+    return out
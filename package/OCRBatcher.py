@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+
+class OCRBatcher:
+    """
+    Faz a ponte entre os workers de OCR (uma página por vez) e
+    extract_text_batch (várias páginas por requisição). O primeiro worker que
+    pede uma página de um grupo dispara a análise do grupo inteiro; os demais
+    esperam o mesmo resultado. Se o grupo falhar, cada página é refeita
+    sozinha, para que uma imagem ruim não derrube as vizinhas.
+    """
+
+    def __init__(
+        self,
+        ocr_client: Any,
+        groups: List[List[str]],
+        log: Callable[[str], None] = print,
+        upload_path: Optional[Callable[[str], str]] = None,  # imagem -> versão pré-processada
+    ):
+        self.ocr = ocr_client
+        self.log = log
+        self.upload_path = upload_path
+        self._groups = groups
+        self._group_of: Dict[str, int] = {path: gi for gi, group in enumerate(groups) for path in group}
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._group_of
+
+    def extract_text(self, path: str) -> str:
+        gi = self._group_of[path]
+        with self._lock:
+            future = self._futures.get(gi)
+            owner = future is None
+            if owner:
+                future = self._futures[gi] = Future()
+
+        if owner:
+            group = self._groups[gi]
+            try:
+                kwargs = {"upload_paths": [self.upload_path(p) for p in group]} if self.upload_path else {}
+                texts = self.ocr.extract_text_batch(group, save_json=True, pages_per_request=len(group), **kwargs)
+                future.set_result(dict(zip(group, texts)))
+            except Exception as e:
+                future.set_exception(e)
+
+        try:
+            return future.result()[path]
+        except Exception as e:
+            self.log(f"Lote multipágina falhou ({e}); refazendo {path} sozinho...")
+            kwargs = {"upload_path": self.upload_path(path)} if self.upload_path else {}
+            return self.ocr.extract_text(path, save_json=True, **kwargs)
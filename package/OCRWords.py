@@ -0,0 +1,124 @@
+import os
+import gzip
+import bisect
+import threading
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from package.CorrectionPolicy import LOW_CONFIDENCE
+
+
+# sidecar compacto: só o que o caminho de correção usa (página, linha do OCR,
+# confiança, palavra), uma palavra por linha, em gzip; polígonos/spans ficam
+# no JSON bruto (cache). v1 (sem a linha do OCR) continua legível. O cabeçalho
+# leva o hash da imagem de origem (make_file_key): sidecar de outro conteúdo é descartado.
+WORDS_SUFFIX = ".words.gz"
+HEADER = "#ocrwords\tv2"
+HEADER_V1 = "#ocrwords\tv1"
+
+
+def words_path(image_path) -> Path:
+    """images/<lote>/12.jpg -> images/<lote>/12.words.gz"""
+    return Path(image_path).with_suffix(WORDS_SUFFIX)
+
+
+def iter_result_words(result_dict: dict) -> Iterator[Tuple[int, int, str, float]]:
+    """(página, linha do OCR, palavra, confiança); a linha sai do span da palavra dentro das linhas."""
+    pages = result_dict.get("pages") or result_dict.get("analyzeResult", {}).get("pages", [])
+    for page_index, page in enumerate(pages, start=1):
+        page_number = page.get("pageNumber", page_index)
+        starts, ends = [], []
+        for line in page.get("lines", []):
+            spans = line.get("spans") or [{}]
+            offset = spans[0].get("offset", -1)
+            starts.append(offset)
+            ends.append(offset + sum(span.get("length", 0) for span in spans))
+        order = sorted(range(len(starts)), key=starts.__getitem__)
+        sorted_starts = [starts[i] for i in order]
+        line_number = 0
+        for word in page.get("words", []):
+            content = word.get("content", "").strip()
+            if not content:
+                continue
+            offset = (word.get("span") or {}).get("offset")
+            if offset is not None:
+                pos = bisect.bisect_right(sorted_starts, offset) - 1
+                if pos >= 0 and offset < ends[order[pos]]:
+                    line_number = order[pos]
+            yield page_number, line_number, content, word.get("confidence", 0.0)
+
+
+def write_words(path, result_dict: dict, source_hash: Optional[str] = None) -> Path:
+    """Grava o sidecar compacto (escrita atômica: tmp + replace)."""
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6, newline="\n") as f:
+        f.write(HEADER + (f"\t{source_hash}" if source_hash else "") + "\n")
+        for page, line, content, confidence in iter_result_words(result_dict):
+            # tab/quebra de linha não aparecem em palavras de OCR, mas não podem quebrar o formato
+            content = content.replace("\t", " ").replace("\n", " ")
+            # precisão cheia (:g): arredondar para 3 casas levaria 0.8496 para 0.850 e mudaria a rota da página
+            f.write(f"{page}\t{line}\t{confidence:g}\t{content}\n")
+    os.replace(tmp, path)
+    return path
+
+
+def _format(header_line: str) -> Tuple[str, Optional[str]]:
+    """'#ocrwords\tv2\t<hash>' -> ('#ocrwords\tv2', '<hash>')"""
+    fields = header_line.rstrip("\n").split("\t")
+    return "\t".join(fields[:2]), (fields[2] if len(fields) > 2 and fields[2] else None)
+
+
+def words_source_hash(path) -> Optional[str]:
+    """Hash da imagem de origem gravado no cabeçalho (None em sidecars antigos)."""
+    with gzip.open(path, "rt", encoding="utf-8", newline="\n") as f:
+        return _format(f.readline())[1]
+
+
+def iter_words(path) -> Iterator[Tuple[int, Optional[int], str, float]]:
+    """Lê o sidecar em streaming: (página, linha do OCR ou None no v1, palavra, confiança)."""
+    with gzip.open(path, "rt", encoding="utf-8", newline="\n") as f:
+        header, _ = _format(f.readline())
+        if header == HEADER_V1:
+            for row in f:
+                page, confidence, content = row.rstrip("\n").split("\t", 2)
+                yield int(page), None, content, float(confidence)
+            return
+        if header != HEADER:
+            raise ValueError(f"{path}: formato de palavras desconhecido ({header!r})")
+        for row in f:
+            page, line, confidence, content = row.rstrip("\n").split("\t", 3)
+            yield int(page), int(line), content, float(confidence)
+
+
+def read_annotated(path, threshold: float = LOW_CONFIDENCE) -> Tuple[str, dict, str]:
+    """
+    Texto anotado ([palavra | conf=...]) + estatísticas de confiança (mesmo
+    formato de confidence_stats) + texto simples com as quebras de linha do
+    OCR (sidecar v1: uma linha só), numa única passada, sem montar o documento.
+    """
+    words = []
+    lines: list = []
+    current = None
+    total = low = 0
+    confidence_sum = 0.0
+    for page, line, content, confidence in iter_words(path):
+        if not lines or (line is not None and (page, line) != current):
+            lines.append([])
+            current = (page, line)
+        lines[-1].append(content)
+        total += 1
+        confidence_sum += confidence
+        if confidence >= threshold:
+            words.append(content)
+        else:
+            low += 1
+            words.append(f"[{content} | conf={confidence:.2f}]")
+    stats = {
+        "words": total,
+        "low_confidence_words": low,
+        "low_share": round(low / total, 4) if total else 0.0,
+        "mean_confidence": round(confidence_sum / total, 4) if total else 0.0,
+    }
+    plain = "\n".join(" ".join(line) for line in lines)
+    return " ".join(words), stats, plain
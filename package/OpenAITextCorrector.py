@@ -1,17 +1,44 @@
 import os
 import json
-from openai import OpenAI
-from typing import Optional, Dict, Any
-from dotenv import load_dotenv
-import streamlit as st
+import threading
+from typing import Optional, Dict, Any, List
+
+from package.Config import get_config
+from package.DiskCache import DiskCache, CACHE_ROOT
+from package.TextChunking import estimate_tokens, split_text, pack_pages, join_pages, split_pages
+from package.RateLimiter import AdaptiveLimiter, limiter_for
+from package.RunMetrics import timed
 
 class OpenAITextCorrector:
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini"):
-        load_dotenv()
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY") or st.secrets.get("OPENAI_API_KEY")
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.4,
+        cache: Optional[DiskCache] = None,
+        use_cache: bool = True,
+        token_budget: int = 6000,     # máx. de tokens de conteúdo por requisição
+        batch_max_pages: int = 8,     # máx. de páginas por requisição agrupada
+        rate_limiter: Optional[AdaptiveLimiter] = None,  # padrão: o limitador compartilhado da OpenAI
+    ):
+        self.api_key = api_key or get_config("OPENAI_API_KEY")
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
-        self.system_prompt = (
+        self.temperature = temperature
+        self.token_budget = max(1, int(token_budget))
+        self.batch_max_pages = max(1, int(batch_max_pages))
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.rate_limiter = rate_limiter or limiter_for("openai")
+
+        # memoização local: (modelo, prompt, temperatura, conteúdo) -> correção
+        if cache is None and use_cache:
+            max_mb = int(os.getenv("LLM_CACHE_MAX_MB", "128"))
+            cache = DiskCache(CACHE_ROOT / "llm", max_bytes=max_mb * 1024 * 1024)
+        self.cache = cache
+        # prompt base; configure()/set_prompt() remontam system_prompt a partir dele
+        self.mode: Optional[str] = None
+        self.lang: Optional[str] = None
+        self.base_prompt = (
             "You are an assistant specialized in correcting texts with common OCR (Optical Character Recognition) errors. "
             "Your mission is to make the content readable and grammatically correct, without changing the original meaning. "
             "You may receive the text in two forms:\n"
@@ -26,22 +53,135 @@ class OpenAITextCorrector:
             "- Remove useless symbols, page numbers, and disconnected words that hinder readability.\n"
             "- Never invent information or alter the meaning of the content."
         )
+        self.system_prompt = self.base_prompt
+
+
 
+    @property
+    def client(self):
+        # a SDK da OpenAI só é importada na primeira requisição (correções em cache não pagam o import)
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
 
+                    # retries ficam com o rate_limiter (RPM/TPM, Retry-After, backoff com jitter)
+                    self._client = OpenAI(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    LANGUAGES = {"por": "Portuguese", "eng": "English", "spa": "Spanish", "fra": "French"}
 
     def set_prompt(self, prompt: str):
-        self.system_prompt = prompt
+        """Troca o prompt base (o modo/idioma de configure continuam valendo)."""
+        self.base_prompt = prompt
+        self.system_prompt = self._build_prompt()
+
+    def configure(self, mode: Optional[str] = None, lang: Optional[str] = None):
+        """
+        Ajusta o prompt ao tipo de documento ("printed" | "handwritten") e ao
+        idioma ("por" | "eng" | "spa" | "fra"). Como o prompt entra na chave do
+        cache, cada combinação tem suas próprias correções memorizadas. O prompt
+        é remontado do base a cada chamada: reconfigurar (ex.: um corretor
+        reaproveitado entre jobs) não acumula instruções.
+        """
+        self.mode, self.lang = mode, lang
+        self.system_prompt = self._build_prompt()
+
+    def _build_prompt(self) -> str:
+        mode, lang = self.mode, self.lang
+        extra = []
+        if mode == "handwritten":
+            extra.append(
+                "- The source is a handwritten manuscript: OCR errors are frequent, so rely more on context "
+                "to restore misread words."
+            )
+        elif mode == "printed":
+            extra.append("- The source is a printed document: OCR errors are rare, so keep edits minimal.")
+        if lang in self.LANGUAGES:
+            extra.append(f"- The text is in {self.LANGUAGES[lang]}. Answer in the same language; never translate.")
+        if extra:
+            return self.base_prompt + "\n" + "\n".join(extra)
+        return self.base_prompt
 
     def correct_text(self, raw_text: str) -> str:
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": f"Corrija o seguinte texto OCR:\n{raw_text}"}
-            ],
-            temperature=0.4,
-        )
-        return response.choices[0].message.content.strip()
+        # documentos longos são quebrados para não estourar o contexto
+        chunks = split_text(raw_text, self.token_budget)
+        return "\n\n".join(self._complete(f"Corrija o seguinte texto OCR:\n{chunk}") for chunk in chunks)
+
+    def correct_texts(self, texts: List[str]) -> List[str]:
+        """
+        Corrige várias páginas juntando as pequenas numa mesma requisição
+        (até token_budget / batch_max_pages), delimitadas por marcadores
+        <<<PAGINA n>>>. Páginas que não voltarem com marcador são refeitas
+        sozinhas. Devolve uma correção por página, na mesma ordem.
+        """
+        results: List[Optional[str]] = [None] * len(texts)
+        for group in pack_pages(texts, self.token_budget, self.batch_max_pages):
+            if len(group) == 1:
+                results[group[0]] = self.correct_text(texts[group[0]])
+                continue
+
+            output = self._complete(
+                f"Corrija o seguinte texto OCR. Ele contém {len(group)} páginas, cada uma iniciada por um "
+                "marcador <<<PAGINA n>>>. Corrija cada página separadamente e devolva todas na mesma ordem, "
+                "cada uma precedida pelo seu marcador original, sem texto fora dos marcadores.\n\n"
+                + join_pages([texts[i] for i in group])
+            )
+            pages = split_pages(output, len(group))
+            for pos, i in enumerate(group):
+                # página que voltou vazia é resposta válida; só a sem marcador é refeita
+                results[i] = pages[pos] if pos in pages else self.correct_text(texts[i])
+        return results
+
+    def _complete(self, user_content: str) -> str:
+        """
+        Chamada ao chat completions com memoização. A chave inclui o prompt de
+        sistema atual, então set_prompt invalida naturalmente as entradas antigas.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = DiskCache.make_key(self.model, self.system_prompt, repr(self.temperature), user_content)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached["content"]
+
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_content}
+        ]
+
+        def attempt():
+            with timed("llm.request", model=self.model) as m:
+                raw = self.client.chat.completions.with_raw_response.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                )
+                response = raw.parse()
+                if response.usage is not None:
+                    m["prompt_tokens"] = response.usage.prompt_tokens
+                    m["completion_tokens"] = response.usage.completion_tokens
+            self.rate_limiter.observe_headers(raw.headers)
+            return response
+
+        # cota de tokens: entrada + saída parecida (é uma correção)
+        expected_tokens = 2 * estimate_tokens(self.system_prompt + user_content)
+        response = self.rate_limiter.call(attempt, tokens=expected_tokens)
+        content = response.choices[0].message.content.strip()
+
+        if cache_key is not None:
+            self.cache.set(cache_key, {"content": content})
+        return content
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def rate_limit_stats(self) -> dict:
+        return self.rate_limiter.stats()
 
     def correct_text_from_json(self, json_dict: dict) -> str:
         """
@@ -56,16 +196,7 @@ class OpenAITextCorrector:
             # (Opcional) Debug para visualizar o que está sendo enviado
             print("[DEBUG] Texto enviado ao LLM:", raw_text[:300])
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": f"Corrija o seguinte texto OCR:\n{raw_text}"}
-                ],
-                temperature=0.4,
-            )
-
-            return response.choices[0].message.content.strip()
+            return self.correct_text(raw_text)
         
         except Exception as e:
             print(f"[ERRO] Falha ao corrigir JSON: {e}")
@@ -0,0 +1,72 @@
+import os
+import hashlib
+import threading
+import zipfile
+from pathlib import Path
+from typing import Sequence, Union
+
+from package.DiskCache import CACHE_ROOT
+
+
+# já comprimidos: deflate só gastaria CPU (um .docx é um zip)
+STORED_SUFFIXES = {".docx", ".zip", ".gz", ".jpg", ".jpeg", ".png", ".pdf"}
+
+
+def archive_key(files: Sequence[Path]) -> str:
+    """Nome, tamanho e mtime de cada arquivo: qualquer saída regravada muda a chave."""
+    h = hashlib.sha256(b"outputs-zip-v1")
+    for p in sorted(files, key=lambda p: p.name):
+        st = p.stat()
+        h.update(f"\0{p.name}\0{st.st_size}\0{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class ArchiveCache:
+    """
+    ZIPs das saídas de um lote gravados direto em disco (zipfile copia cada
+    arquivo em blocos, nada é montado em memória) e reaproveitados enquanto
+    nenhuma saída mudar. Limpeza LRU por mtime ao passar de max_bytes.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path, None] = None, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir) if cache_dir else CACHE_ROOT / "zips"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+
+    def archive(self, files: Sequence[Union[str, Path]]) -> Path:
+        """Caminho do ZIP com `files` (arcname = nome do arquivo); gera só se ainda não existir."""
+        files = [Path(p) for p in files]
+        out = self.cache_dir / f"{archive_key(files)}.zip"
+        with self._lock:  # dois reruns pedindo o mesmo ZIP não geram duas vezes
+            if out.exists():
+                os.utime(out)
+                return out
+            tmp = out.with_name(f"{out.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                with zipfile.ZipFile(tmp, "w") as zf:
+                    for p in files:
+                        compression = zipfile.ZIP_STORED if p.suffix.lower() in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+                        zf.write(p, arcname=p.name, compress_type=compression)
+                os.replace(tmp, out)
+            finally:
+                tmp.unlink(missing_ok=True)
+        self._evict(keep=out)
+        return out
+
+    def _evict(self, keep: Path) -> None:
+        entries = []
+        for p in self.cache_dir.glob("*.zip"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            p.unlink(missing_ok=True)
+            total -= size
@@ -1,9 +1,79 @@
 import os
 import json
 from pathlib import Path
-from typing import Any, Iterable
-import re
+from typing import Any, Callable, Iterable, Optional
+import inspect
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from dataclasses import dataclass, field
 
+from package.AsyncBridge import AsyncBridge
+from package.AzureOCRfile import result_to_text, sidecar_source_hash
+from package.CorrectionBatcher import CorrectionBatcher
+from package.DiskCache import DiskCache
+from package.LoteCatalog import natural_key
+from package.LoteManifest import LoteManifest
+from package.LoteScheduler import SCHEDULE_POLICIES, CompletionTracker, schedule
+from package.CorrectionPolicy import LOW_CONFIDENCE, ConfidencePolicy, confidence_stats, strip_confidence_markers
+from package.MultiPageBatch import BATCHABLE_EXTENSIONS
+from package.OCRBatcher import OCRBatcher
+from package.OCRWords import WORDS_SUFFIX, read_annotated, words_path
+from package.ProgressTracker import ProgressTracker
+from package.RunMetrics import RunMetrics, ThreadProfiler, bind, timed
+from package.StagedPipeline import StagedPipeline
+
+
+@dataclass(frozen=True)
+class PageJob:
+    folder: Path
+    image: Path
+    index: int            # posição da página em _iter_images_sorted
+    force_ocr: bool = False
+    input_hash: str = ""  # hash do conteúdo (chave no manifesto do lote)
+
+
+@dataclass(frozen=True)
+class OCRText:
+    text: str
+    stats: Optional[dict] = None  # confidence_stats da página (se houver política)
+    source: str = "ocr"           # "ocr" | "sidecar" (OCR já salvo ao lado da imagem)
+    seconds: float = 0.0          # tempo do estágio de OCR
+    plain: Optional[str] = None   # texto sem marcadores, com as quebras de linha do OCR (rota "skip")
+
+
+@dataclass
+class LoteOutput:
+    folder: Path
+    output_name: str
+    hashes: list
+    reused: set                                  # índices remontados do manifesto
+    ready: dict = field(default_factory=dict)    # índice -> texto (None = falhou), esperando a vez
+    next_index: int = 0
+    writer: Any = None
+    included: list = field(default_factory=list)  # hashes das páginas já anexadas, na ordem
+
+
+class TextCollector:
+    """Adaptador para exportadores antigos (só save_text_to_docx): junta tudo no close()."""
+
+    def __init__(self, exporter: Any, output_name: str):
+        self.exporter = exporter
+        self.output_name = output_name
+        self.texts: list[str] = []
+
+    @property
+    def pages(self) -> int:
+        return len(self.texts)
+
+    def add_page(self, text: str) -> None:
+        self.texts.append(text)
+
+    def close(self):
+        if not self.texts:
+            return None
+        return self.exporter.save_text_to_docx("\n\n".join(self.texts), self.output_name)
 
 
 class PipelineRunner:
@@ -20,8 +90,31 @@ class PipelineRunner:
         base_dir: str = "images",
         output_dir: str = "output",
         order_by: str = "name",   # "name" | "mtime" | "ctime"
+        max_workers: int = 1,     # padrão de workers para cada estágio
+        ocr_workers: Optional[int] = None,
+        llm_workers: Optional[int] = None,
+        queue_size: int = 8,      # máx. de páginas esperando entre estágios
+        pages_per_request: Optional[int] = None,  # >1: várias páginas por análise (padrão: o do ocr_client)
+        llm_batch_pages: int = 1,  # >1: várias páginas por requisição de correção
+        llm_batch_linger: float = 0.5,  # segundos esperando completar um lote de correção
+        correction_policy: Optional[ConfidencePolicy] = None,  # pula/barateia páginas com OCR limpo
+        cheap_corrector: Any = None,  # usado nas páginas roteadas para "cheap"
+        use_manifest: bool = True,    # reprocessa só páginas novas/alteradas/com falha
+        log: Callable[[str], None] = print,  # destino das mensagens (ex.: log de um job)
+        on_event: Optional[Callable[[dict], None]] = None,  # eventos de progresso estruturados
+        metrics_dir: Optional[str] = None,   # onde gravar run_<ts>.json (padrão: logs/metrics)
+        profile_path: Optional[str] = None,  # grava um .prof (cProfile dos workers) da execução
+        preprocessor: Any = None,     # ImagePreprocessor: reduz as imagens antes do OCR
+        schedule_policy: str = "round_robin",  # ordem das páginas entre lotes (ver LoteScheduler)
+        lote_priority: Optional[dict] = None,  # nome do lote -> prioridade (maior vai antes)
+        catalog: Any = None,          # LoteCatalog de base_dir: listagem indexada + status/saídas por página
     ):
+        self.log = log
+        self.on_event = on_event
+        self.progress = ProgressTracker(on_event, log=self.log)
         self.ocr = ocr_client
+        # cliente assíncrono (ex.: AsyncAzureOCRClient): roda num loop dedicado
+        self._async_bridge = AsyncBridge() if inspect.iscoroutinefunction(getattr(ocr_client, "extract_text", None)) else None
         self.corrector = text_corrector
         self.exporter = exporter
         self.base_dir = Path(base_dir)
@@ -34,66 +127,652 @@ class PipelineRunner:
         # como ordenar as imagens dentro de cada pasta
         self.order_by = order_by
 
-    # --- helpers de ordenação ---
-    @staticmethod
-    def _natural_key(s: str) -> list:
-        # "10" depois de "2"? natural sort resolve.
-        return [int(t) if t.isdigit() else t.lower() for t in re.findall(r"\d+|\D+", s)]
+        # concorrência por estágio: 1 = sequencial (comportamento antigo)
+        self.max_workers = max(1, int(max_workers))
+        self.ocr_workers = max(1, int(ocr_workers or self.max_workers))
+        self.llm_workers = max(1, int(llm_workers or self.max_workers))
+        self.queue_size = max(1, int(queue_size))
+        self._log_lock = threading.Lock()
+
+        # envio multipágina: só se o cliente souber fazer (extract_text_batch)
+        self.pages_per_request = max(1, int(pages_per_request or getattr(ocr_client, "pages_per_request", 1)))
+        self._batcher: Optional[OCRBatcher] = None
+
+        # correção agrupada: só se o corretor souber fazer (correct_texts)
+        self.llm_batch_pages = max(1, int(llm_batch_pages))
+        self.llm_batch_linger = llm_batch_linger
+        self._llm_batcher: Optional[CorrectionBatcher] = None
+
+        # memos da validação de sidecars: (caminho, tamanho, mtime) -> hash
+        self._sidecar_hashes: dict = {}
+        self._content_hashes: dict = {}
+
+        self.preprocessor = preprocessor
+
+        # catálogo de outra raiz (ex.: --input-dir apontando para outra pasta) não serve
+        if catalog is not None and Path(catalog.images_dir).resolve() != self.base_dir.resolve():
+            catalog = None
+        self.catalog = catalog
+
+        # vários lotes dividem os mesmos workers; cada .docx sai quando o seu lote termina
+        if schedule_policy not in SCHEDULE_POLICIES:
+            raise ValueError(f"schedule_policy inválida: {schedule_policy!r} (use {', '.join(SCHEDULE_POLICIES)})")
+        self.schedule_policy = schedule_policy
+        self.lote_priority = dict(lote_priority or {})
+        self._outputs: dict[Path, LoteOutput] = {}
+        self._completion: Optional[CompletionTracker] = None
+        self._export_pool: Optional[ThreadPoolExecutor] = None
+        self._export_futures: list = []
+        self.policy = correction_policy
+        self.cheap_corrector = cheap_corrector
+        # caminho de correção por página da última execução (skip/cheap/full)
+        self.page_routes: list[dict] = []
+        self.routes_log_path = self.LOGS_DIR / "rotas_correcao.jsonl"
+
+        # manifesto por lote (ver LoteManifest)
+        self.use_manifest = use_manifest
+        self._manifests: dict[Path, LoteManifest] = {}
+        self._signature = ""
+        self._failed = 0
 
+        # profundidade de filas / vazão da última execução (por estágio)
+        self.stage_stats: dict = {}
+
+        # tempos por página/etapa (ver RunMetrics) e perfil opcional
+        self.metrics = RunMetrics()
+        self.metrics_dir = Path(metrics_dir) if metrics_dir else self.LOGS_DIR / "metrics"
+        self.metrics_path: Optional[Path] = None
+        self.profile_path = profile_path
+        self._profiler: Optional[ThreadProfiler] = None
+
+    # --- helpers de ordenação ---
     def _iter_images_sorted(self, folder: Path) -> list[Path]:
+        if self.catalog is not None:
+            # consulta indexada; a pasta só é relida se mudou desde o último sync
+            return self.catalog.pages(folder.name, self.order_by if self.order_by in ("mtime", "ctime") else "name")
+
         exts = {".jpg", ".jpeg", ".png", ".pdf"}
-        files = [p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in exts]
-        # ignora temporários, caso existam
-        files = [p for p in files if not p.name.startswith("__tmp__")]
+        # scandir + um stat por arquivo (fora da chave de ordenação); ignora temporários
+        with os.scandir(folder) as it:
+            entries = [
+                e for e in it
+                if e.is_file() and Path(e.name).suffix.lower() in exts and not e.name.startswith("__tmp__")
+            ]
 
         if self.order_by == "name":
-            return sorted(files, key=lambda p: self._natural_key(p.name))
+            entries.sort(key=lambda e: natural_key(e.name))
         elif self.order_by == "mtime":
-            return sorted(files, key=lambda p: p.stat().st_mtime)
+            entries.sort(key=lambda e: e.stat().st_mtime_ns)  # DirEntry.stat() fica em cache
         else:  # "ctime" (cuidado no Linux/WSL)
-            st = files[0].stat() if files else None
-            return sorted(files, key=lambda p: p.stat().st_ctime)
-
-    def run(self, force_ocr: bool = False):
-        for folder in self.base_dir.iterdir():
-            if not folder.is_dir():
-                continue
+            entries.sort(key=lambda e: e.stat().st_ctime_ns)
+        return [folder / e.name for e in entries]
 
-            print(f"Processando pasta: {folder.name}")
-            all_text = []
+    def run(self, force_ocr: bool = False, lotes: Optional[Iterable[str]] = None) -> dict:
+        """
+        Processa os lotes (subpastas de base_dir); `lotes` restringe a execução
+        a essas pastas. Devolve um resumo com páginas feitas/reaproveitadas/com falha.
+        """
+        only = set(lotes) if lotes is not None else None
+        if self.catalog is not None:
+            folders = [self.base_dir / name for name in self.catalog.lotes() if only is None or name in only]
+        else:
+            folders = [f for f in self.base_dir.iterdir() if f.is_dir() and (only is None or f.name in only)]
+        self._failed = 0
 
+        self._signature = self._correction_signature()
+        self._manifests = {}
+        jobs_by_folder: dict[Path, list[PageJob]] = {}
+        folder_pages: list[tuple[Path, list[Path], list[str]]] = []
+        total_reused = 0
+        for folder in folders:
+            self.log(f"Processando pasta: {folder.name}")
             # >>> agora ordena por name|mtime|ctime conforme self.order_by
             image_files = self._iter_images_sorted(folder)
 
-            for image in image_files:
-                try:
-                    json_path = image.with_suffix(".json")
-                    if json_path.exists() and not force_ocr:
-                        print(f"JSON já existe para {image.name}, pulando OCR...")
-                        annotated_text = self._extract_words_with_confidence(json_path)
-                        corrected = self.corrector.correct_text(annotated_text)
-                    else:
-                        print(f"🖼️  Extraindo via OCR: {image.name}")
-                        raw_text = self.ocr.extract_text(str(image), save_json=True)
-                        corrected = self.corrector.correct_text(raw_text)
+            manifest = LoteManifest(folder) if self.use_manifest else None
+            hashes = [manifest.input_hash(image) if manifest else "" for image in image_files]
+            if manifest:
+                self._drop_stale_sidecars(folder, manifest.replaced)
+            reused = 0
+            folder_jobs = jobs_by_folder[folder] = []
+            for i, (image, input_hash) in enumerate(zip(image_files, hashes)):
+                # já corrigida com a mesma configuração: remonta do texto salvo
+                if manifest and not force_ocr and manifest.is_done(input_hash, self._signature):
+                    reused += 1
+                    continue
+                folder_jobs.append(PageJob(folder, image, i, force_ocr, input_hash))
+
+            queued = {job.index for job in folder_jobs}
+            self._catalog_update(folder, [
+                (image.name, "queued" if i in queued else "done", None, input_hash or None)
+                for i, (image, input_hash) in enumerate(zip(image_files, hashes))
+            ])
+
+            if manifest:
+                manifest.prune(hashes, [p.name for p in image_files])
+                self._manifests[folder] = manifest
+                if reused:
+                    self.log(f"{reused} página(s) de {folder.name} reaproveitada(s) do manifesto.")
+            total_reused += reused
+            folder_pages.append((folder, image_files, hashes))
+
+        # grupos multipágina montados na ordem de cada pasta, antes de intercalar os lotes
+        jobs_in_folder_order = [job for folder_jobs in jobs_by_folder.values() for job in folder_jobs]
+        self._batcher = self._build_batcher(jobs_in_folder_order)
+        jobs = schedule(
+            jobs_by_folder,
+            self.schedule_policy,
+            priorities={folder: self.lote_priority.get(folder.name, 0) for folder in jobs_by_folder},
+            quantum=self.pages_per_request if self._batcher is not None else 1,
+        )
+        if len(jobs_by_folder) > 1:
+            self.log(f"[schedule] {len(jobs_by_folder)} lote(s) em paralelo, política {self.schedule_policy}")
 
-                    all_text.append(corrected)
+        if self.preprocessor is not None:
+            # adianta a redução no pool de processos enquanto o OCR começa
+            self.preprocessor.submit(
+                job.image for job in jobs if job.force_ocr or self._find_sidecar(job.image, job.input_hash) is None
+            )
+        self._llm_batcher = self._build_llm_batcher()
+        # cada worker do estágio fica parado até a sua página voltar do lote:
+        # com llm_workers * llm_batch_pages threads, cabem llm_workers lotes
+        # cheios em voo (o número de requisições simultâneas não muda)
+        llm_stage_workers = self.llm_workers * self.llm_batch_pages if self._llm_batcher is not None else self.llm_workers
+        self.page_routes = []
 
-                except Exception as e:
-                    self._log_failure(folder.name, image.name, str(e))
-                    print(f"Falha ao processar {image.name}: {e}")
+        self.metrics = RunMetrics()
+        self._profiler = ThreadProfiler() if self.profile_path else None
+        self.progress = ProgressTracker(self.on_event, log=self.log)
+        self.progress.start(
+            pages_total=len(jobs) + total_reused,
+            pages_reused=total_reused,
+            lotes=[folder.name for folder in folders],
+        )
 
-            if all_text:
-                final_text = "\n\n".join(all_text)
-                output_name = f"{folder.name}.docx"
-                path = self.exporter.save_text_to_docx(final_text, output_name)
-                print(f"Documento salvo em: {path}")
+        # cada lote é exportado assim que a última página dele termina
+        # o .docx de cada lote cresce em ordem conforme as páginas terminam
+        # (thread única de exportação) e é fechado quando a última termina
+        self._outputs = {}
+        for folder, image_files, hashes in folder_pages:
+            output_name = f"{folder.name}.docx"
+            output_path = Path(getattr(self.exporter, "output_dir", self.output_dir)) / output_name
+            manifest = self._manifests.get(folder)
+            if (
+                not jobs_by_folder[folder]
+                and output_path.exists()
+                and manifest is not None
+                and manifest.exported_pages(output_name) == hashes
+            ):
+                self.log(f"Nada mudou em {folder.name}; mantendo {output_path}")
+                continue
+            # páginas removidas/reordenadas sem nada novo: remonta só dos textos do manifesto
+            pending_indexes = {job.index for job in jobs_by_folder[folder]}
+            self._outputs[folder] = LoteOutput(
+                folder, output_name, hashes,
+                reused={i for i in range(len(hashes)) if i not in pending_indexes},
+            )
+        self._export_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        self._export_futures = []
+        self._completion = CompletionTracker(
+            {folder: len(folder_jobs) for folder, folder_jobs in jobs_by_folder.items()},
+            lambda folder: self._submit_export(self._finish_lote, folder),
+        )
+        for folder, folder_jobs in jobs_by_folder.items():
+            if not folder_jobs:
+                self._submit_export(self._finish_lote, folder)  # tudo reaproveitado do manifesto
+
+        # OCR e correção em estágios separados: o OCR da página N+1 sobrepõe
+        # a correção da página N, e a fila limitada segura o OCR se o LLM atrasar
+        pipeline = StagedPipeline(
+            [
+                ("ocr", self._instrumented("ocr", self._ocr_stage), self.ocr_workers),
+                ("llm", self._instrumented("llm", self._correction_stage), llm_stage_workers),
+            ],
+            queue_size=self.queue_size,
+            on_error=self._on_stage_error,
+            on_result=self._on_page_result,
+            log=self.log,
+        )
+        try:
+            results = pipeline.run(jobs)
+        finally:
+            self._export_pool.shutdown(wait=True)
+        for future in self._export_futures:
+            error = future.exception()
+            if error is not None:
+                self.log(f"Falha ao exportar: {error}")
+
+        self.stage_stats = pipeline.snapshot()
+        self._print_stage_stats(pipeline.bottleneck())
+        self._print_cache_stats()
+        self._print_rate_limit_stats()
+        self._print_preprocess_stats()
+        self._report_routes()
+
+        summary = {
+            "lotes": [folder.name for folder in folders],
+            "pages": sum(len(image_files) for _, image_files, _ in folder_pages),
+            "processed": len(results),
+            "reused": total_reused,
+            "failed": self._failed,
+        }
+        self._write_metrics(summary)
+        self.progress.emit("run_finished", summary=summary, stages=self.stage_stats, cache=self._cache_stats())
+        return summary
+
+    def _on_page_result(self, job: PageJob, text: str):
+        self._submit_export(self._accept_page, job.folder, job.index, text)
+        self._completion.done(job.folder)
+
+    def _submit_export(self, fn: Callable, *args):
+        self._export_futures.append(self._export_pool.submit(fn, *args))
+
+    def _accept_page(self, folder: Path, index: int, text: Optional[str]):
+        """Roda na thread de exportação: guarda a página e anexa o que já estiver em ordem."""
+        output = self._outputs.get(folder)
+        if output is None:
+            return
+        output.ready[index] = text
+        self._advance(output)
+
+    def _advance(self, output: "LoteOutput"):
+        # remonta na ordem de _iter_images_sorted; falhas ficam de fora
+        manifest = self._manifests.get(output.folder)
+        while output.next_index < len(output.hashes):
+            i = output.next_index
+            if i in output.ready:
+                text = output.ready.pop(i)
+            elif i in output.reused:
+                input_hash = output.hashes[i]
+                text = manifest.corrected_text(input_hash) if manifest and manifest.is_done(input_hash, self._signature) else None
             else:
-                print("No all text captured.")
+                break  # página ainda em processamento
+            if text is not None:
+                if output.writer is None:
+                    output.writer = self._open_document(output.output_name)
+                with bind(self.metrics, lote=output.folder.name):
+                    output.writer.add_page(text)
+                output.included.append(output.hashes[i])
+            output.next_index += 1
+
+    def _finish_lote(self, folder: Path):
+        output = self._outputs.get(folder)
+        if output is None:
+            return
+        t0 = time.perf_counter()
+        self._advance(output)
+        with bind(self.metrics, lote=folder.name):
+            path = output.writer.close() if output.writer is not None else None
+        if path is None:
+            self.log(f"No all text captured ({folder.name}).")
+            return
+        pages = output.writer.pages
+        manifest = self._manifests.get(folder)
+        if manifest is not None:
+            manifest.mark_exported(output.output_name, output.included)
+        if self.catalog is not None:
+            try:
+                self.catalog.add_output(folder.name, path)
+            except Exception as e:
+                self.log(f"[catalog] falha ao registrar {path}: {e}")
+        self.metrics.record("export", time.perf_counter() - t0, lote=folder.name, pages=pages)
+        self.log(f"Documento salvo em: {path}")
+        self.progress.emit(
+            "lote_exported", lote=folder.name, path=str(path),
+            pages=pages, export_s=round(time.perf_counter() - t0, 3),
+        )
+
+    def _open_document(self, output_name: str):
+        open_document = getattr(self.exporter, "open_document", None)
+        if callable(open_document):
+            return open_document(output_name)
+        return TextCollector(self.exporter, output_name)  # exportador só com save_text_to_docx
+
+    def _catalog_update(self, folder: Path, updates: list):
+        # status por página no catálogo; erro de SQLite não derruba a página
+        if self.catalog is None:
+            return
+        try:
+            self.catalog.set_statuses(folder.name, updates)
+        except Exception as e:
+            self.log(f"[catalog] falha ao atualizar {folder.name}: {e}")
+
+    def _instrumented(self, stage: str, fn: Callable) -> Callable:
+        """Envolve um estágio: bind das métricas com a página atual, tempo total e perfil."""
+        def run_stage(job: PageJob, prev: Any = None):
+            t0 = time.perf_counter()
+            with bind(self.metrics, lote=job.folder.name, arquivo=job.image.name):
+                if self._profiler is not None:
+                    with self._profiler.profile():
+                        result = fn(job, prev)
+                else:
+                    result = fn(job, prev)
+            self.metrics.record(stage, time.perf_counter() - t0, lote=job.folder.name, arquivo=job.image.name)
+            return result
+        return run_stage
+
+    def _write_metrics(self, summary: dict):
+        if not self.metrics.samples:
+            return
+        try:
+            name = f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{'_'.join(summary['lotes'])[:60]}.json"
+            self.metrics_path = self.metrics.write(
+                self.metrics_dir / name,
+                extra={
+                    "summary": summary, "pipeline": self.stage_stats,
+                    "cache": self._cache_stats(), "rate_limit": self._rate_limit_stats(),
+                },
+            )
+            self.log(f"[metrics] {self.metrics_path}")
+            for stage, st in self.metrics.summary().items():
+                self.log(f"[metrics:{stage}] n={st['count']} p50={st['p50_s']}s p95={st['p95_s']}s total={st['total_s']}s")
+        except OSError as e:
+            self.log(f"[metrics] não consegui gravar métricas: {e}")
+        if self._profiler is not None:
+            path = self._profiler.dump(self.profile_path)
+            if path:
+                self.log(f"[profile] {path}")
+
+    def _correction_signature(self) -> str:
+        """
+        Muda quando qualquer coisa que decide o texto corrigido muda (páginas
+        antigas são refeitas): modelo/prompt/temperatura dos corretores e a
+        política de confiança com os seus limiares.
+        """
+        def describe(corrector) -> str:
+            if corrector is None:
+                return "-"
+            return "\0".join(
+                str(getattr(corrector, attr, "")) for attr in ("model", "system_prompt", "temperature")
+            )
+
+        policy = "-"
+        if self.policy is not None:
+            policy = json.dumps({"class": type(self.policy).__name__, "low": LOW_CONFIDENCE, **vars(self.policy)}, sort_keys=True)
+        return DiskCache.make_key(
+            describe(self.corrector),
+            describe(self.cheap_corrector if self.policy is not None else None),
+            policy,
+        )[:16]
+
+    def _ocr_cache_key(self, job: PageJob) -> Optional[str]:
+        key_fn = getattr(self.ocr, "cache_key_for", None)
+        if not callable(key_fn):
+            return None
+        try:
+            # o OCR (e o cache dele) vê a versão pré-processada, não o original
+            return key_fn(self._upload_path(str(job.image)))
+        except OSError:
+            return None
+
+    # --- estágios ---
+    def _ocr_stage(self, job: PageJob, _prev: Any = None) -> OCRText:
+        t0 = time.perf_counter()
+        sidecar = self._find_sidecar(job.image, job.input_hash)
+        if sidecar is not None and not job.force_ocr:
+            self.log(f"OCR já existe para {job.image.name} ({sidecar.name}), pulando OCR...")
+            text, stats, plain = self._read_ocr_sidecar(sidecar)
+            return OCRText(text, stats if self.policy is not None else None, "sidecar", time.perf_counter() - t0, plain)
+
+        self.log(f"🖼️  Extraindo via OCR: {job.image.name}")
+        if self._batcher is not None and str(job.image) in self._batcher:
+            text = self._batcher.extract_text(str(job.image))
+        else:
+            kwargs = {}
+            upload = self._upload_path(str(job.image))
+            if upload != str(job.image):
+                kwargs["upload_path"] = upload
+            text = self._call_ocr("extract_text", str(job.image), save_json=True, **kwargs)
+
+        stats = None
+        if self.policy is not None:
+            sidecar = self._find_sidecar(job.image, job.input_hash)
+            if sidecar is not None:
+                _, stats, _ = self._read_ocr_sidecar(sidecar)
+        return OCRText(text, stats, "ocr", time.perf_counter() - t0, text)
+
+    def _drop_stale_sidecars(self, folder: Path, names: Iterable[str]):
+        """Imagem substituída por outro conteúdo com o mesmo nome: o OCR salvo ao lado é da antiga."""
+        for name in names:
+            image = folder / name
+            for path in (words_path(image), image.with_suffix(".json")):
+                if path.exists():
+                    path.unlink(missing_ok=True)
+                    self.log(f"OCR salvo de {name} é de um conteúdo anterior; descartado ({path.name}).")
+
+    def _find_sidecar(self, image: Path, input_hash: str = "") -> Optional[Path]:
+        """
+        OCR já feito: sidecar compacto (.words.gz) ou o JSON completo. O
+        sidecar é só uma cópia do resultado (a fonte é o cache por conteúdo do
+        cliente de OCR): um gravado a partir de outro conteúdo é ignorado e a
+        página volta ao OCR, que consulta o cache pela chave da imagem atual.
+        Sidecars antigos, sem hash, continuam valendo.
+        """
+        for path in (words_path(image), image.with_suffix(".json")):
+            try:
+                recorded = self._sidecar_hash(path)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, EOFError):
+                continue  # sidecar corrompido/truncado: refaz
+            if recorded is not None and recorded != (input_hash or self._content_hash(image)):
+                continue
+            return path
+        return None
+
+    def _sidecar_hash(self, path: Path) -> Optional[str]:
+        st = path.stat()
+        memo_key = (str(path), st.st_size, st.st_mtime_ns)
+        if memo_key not in self._sidecar_hashes:
+            self._sidecar_hashes[memo_key] = sidecar_source_hash(path)
+        return self._sidecar_hashes[memo_key]
+
+    def _content_hash(self, image: Path) -> str:
+        """make_file_key da imagem (o mesmo hash do manifesto), quando o manifesto está desligado."""
+        st = image.stat()
+        memo_key = (str(image), st.st_size, st.st_mtime_ns)
+        if memo_key not in self._content_hashes:
+            self._content_hashes[memo_key] = DiskCache.make_file_key(file_path=image)
+        return self._content_hashes[memo_key]
+
+    def _build_batcher(self, jobs: list[PageJob]) -> Optional[OCRBatcher]:
+        """Agrupa páginas consecutivas da mesma pasta que ainda precisam de OCR."""
+        if self.pages_per_request <= 1 or self._async_bridge is not None:
+            return None
+        if not callable(getattr(self.ocr, "extract_text_batch", None)):
+            return None
+
+        groups: list[list[str]] = []
+        current: list[str] = []
+        current_folder = None
+        for job in jobs:
+            needs_ocr = job.force_ocr or self._find_sidecar(job.image, job.input_hash) is None
+            batchable = needs_ocr and job.image.suffix.lower() in BATCHABLE_EXTENSIONS
+            if not batchable or job.folder != current_folder or len(current) >= self.pages_per_request:
+                if len(current) > 1:
+                    groups.append(current)
+                current = []
+                current_folder = job.folder
+            if batchable:
+                current.append(str(job.image))
+        if len(current) > 1:
+            groups.append(current)
+
+        if not groups:
+            return None
+        return OCRBatcher(self.ocr, groups, log=self.log, upload_path=self._upload_path if self.preprocessor else None)
+
+    def _upload_path(self, image: str) -> str:
+        return self.preprocessor.path_for(image) if self.preprocessor is not None else image
+
+    def _call_ocr(self, method: str, *args, **kwargs):
+        result = getattr(self.ocr, method)(*args, **kwargs)
+        if self._async_bridge is not None:
+            return self._async_bridge.run(result)
+        return result
+
+    def close(self):
+        """Fecha o cliente de OCR assíncrono e o loop dedicado (se houver)."""
+        if self._async_bridge is not None:
+            close = getattr(self.ocr, "close", None)
+            if close is not None:
+                self._async_bridge.run(close())
+            self._async_bridge.close()
+
+    def _correction_stage(self, job: PageJob, page: OCRText) -> str:
+        route = "full"
+        if self.policy is not None and page.stats is not None:
+            route = self.policy.route(page.stats)
+            if route == "cheap" and self.cheap_corrector is None:
+                route = "full"
+
+        t0 = time.perf_counter()
+        if route == "skip":
+            corrected = (page.plain if page.plain is not None else strip_confidence_markers(page.text)).strip()
+        elif route == "cheap":
+            corrected = self.cheap_corrector.correct_text(page.text)
+        elif self._llm_batcher is not None:
+            corrected = self._llm_batcher.correct_text(page.text)
+        else:
+            corrected = self.corrector.correct_text(page.text)
+
+        llm_seconds = time.perf_counter() - t0
+        if self.policy is not None:
+            self._record_route(job, route, page.stats, llm_seconds)
+
+        manifest = self._manifests.get(job.folder)
+        if manifest is not None:
+            manifest.mark_done(
+                job.input_hash, job.image.name, corrected,
+                signature=self._signature, ocr_cache_key=self._ocr_cache_key(job), route=route,
+            )
+
+        self._catalog_update(job.folder, [(job.image.name, "done", None, job.input_hash or None)])
+
+        self.progress.page_done(
+            lote=job.folder.name, arquivo=job.image.name, index=job.index, route=route,
+            ocr_source=page.source, ocr_s=round(page.seconds, 3), llm_s=round(llm_seconds, 3),
+            cache=self._cache_stats(),
+        )
+        return corrected
+
+    def _record_route(self, job: PageJob, route: str, stats: Optional[dict], seconds: float):
+        record = {
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "lote": job.folder.name,
+            "arquivo": job.image.name,
+            "route": route,
+            "llm_seconds": round(seconds, 3),
+            **(stats or {}),
+        }
+        with self._log_lock:
+            self.page_routes.append(record)
+
+    def _report_routes(self):
+        if not self.page_routes:
+            return
+        counts: dict = {}
+        for r in self.page_routes:
+            counts[r["route"]] = counts.get(r["route"], 0) + 1
+        self.log("[policy] " + " ".join(f"{route}={n}" for route, n in sorted(counts.items())))
+
+        with self._log_lock:
+            self.LOGS_DIR.mkdir(parents=True, exist_ok=True)
+            with open(self.routes_log_path, "a", encoding="utf-8") as f:
+                for r in self.page_routes:
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    def _build_llm_batcher(self) -> Optional[CorrectionBatcher]:
+        if self.llm_batch_pages <= 1 or not callable(getattr(self.corrector, "correct_texts", None)):
+            return None
+        return CorrectionBatcher(
+            self.corrector,
+            token_budget=getattr(self.corrector, "token_budget", 6000),
+            max_pages=self.llm_batch_pages,
+            linger=self.llm_batch_linger,
+        )
+
+    def _cache_stats(self) -> dict:
+        out = {}
+        for name, component in (("ocr", self.ocr), ("llm", self.corrector)):
+            stats_fn = getattr(component, "cache_stats", None)
+            stats = stats_fn() if callable(stats_fn) else {}
+            if stats:
+                out[name] = {"hits": stats["hits"], "misses": stats["misses"], "evictions": stats["evictions"]}
+        return out
+
+    def _print_cache_stats(self):
+        for name, stats in self._cache_stats().items():
+            self.log(f"[cache:{name}] hits={stats['hits']} misses={stats['misses']} evictions={stats['evictions']}")
+
+    def _print_preprocess_stats(self):
+        st = self.metrics.summary().get("preprocess")
+        if not st:
+            return
+        saved = st["bytes_in"] - st["bytes_out"]
+        pct = 100.0 * saved / st["bytes_in"] if st["bytes_in"] else 0.0
+        self.log(
+            f"[preprocess] imagens={st['count']} em_cache={st['cached']} "
+            f"{st['bytes_in'] / 1e6:.1f} MB -> {st['bytes_out'] / 1e6:.1f} MB (-{pct:.0f}%) tempo={st['total_s']}s"
+        )
+
+    def _rate_limit_stats(self) -> dict:
+        out = {}
+        for name, component in (("ocr", self.ocr), ("llm", self.corrector)):
+            stats_fn = getattr(component, "rate_limit_stats", None)
+            if callable(stats_fn):
+                out[name] = stats_fn()
+        return out
+
+    def _print_rate_limit_stats(self):
+        for name, st in self._rate_limit_stats().items():
+            if st["retries"] or st["throttled_s"]:
+                self.log(
+                    f"[ratelimit:{name}] chamadas={st['calls']} retries={st['retries']} 429/503={st['throttled']} "
+                    f"desistências={st['gave_up']} tempo_limitado={st['throttled_s']}s concorrência={st['concurrency']}"
+                )
+
+    def _on_stage_error(self, job: PageJob, stage: str, error: Exception):
+        with self._log_lock:
+            self._failed += 1
+        try:
+            self._log_failure(job.folder.name, job.image.name, f"({stage}) {error}")
+            manifest = self._manifests.get(job.folder)
+            if manifest is not None:
+                manifest.mark_failed(job.input_hash, job.image.name, f"({stage}) {error}", self._ocr_cache_key(job))
+            self._catalog_update(job.folder, [(job.image.name, "failed", f"({stage}) {error}", job.input_hash or None)])
+            self.progress.page_failed(lote=job.folder.name, arquivo=job.image.name, index=job.index, stage=stage, error=str(error))
+            self.log(f"Falha ao processar {job.image.name}: {error}")
+        finally:
+            # mesmo sem conseguir registrar a falha (disco cheio, permissão), o lote segue para a exportação
+            if self._completion is not None:
+                self._submit_export(self._accept_page, job.folder, job.index, None)
+                self._completion.done(job.folder)
+
+    def _print_stage_stats(self, bottleneck: Optional[str] = None):
+        for name, st in self.stage_stats.items():
+            self.log(
+                f"[stage:{name}] workers={st['workers']} ok={st['processed']} falhas={st['failed']} "
+                f"fila_max={st['max_queue_depth']} fila_media={st['mean_queue_depth']} "
+                f"uso={st['utilization']:.0%} vazão={st['throughput_per_s']}/s"
+            )
+        if bottleneck:
+            self.log(f"[stage] gargalo provável: {bottleneck}")
 
     def _extract_words_with_confidence(self, json_path: Path) -> str:
-        with open(json_path, "r", encoding="utf-8") as f:
-            json_dict = json.load(f)
+        return self._read_ocr_sidecar(json_path)[0]
+
+    def _read_ocr_sidecar(self, path: Path) -> tuple[str, dict, str]:
+        if path.name.endswith(WORDS_SUFFIX):
+            with timed("ocr.sidecar_read", format="words"):
+                return read_annotated(path, LOW_CONFIDENCE)
+        return self._read_ocr_json(path)
+
+    def _read_ocr_json(self, json_path: Path) -> tuple[str, dict, str]:
+        """Texto anotado ([palavra | conf=...]) + estatísticas de confiança + texto por linha, numa única leitura."""
+        with timed("ocr.sidecar_read", format="json"):
+            with open(json_path, "r", encoding="utf-8") as f:
+                json_dict = json.load(f)
 
         words = []
         pages = json_dict.get("pages") or json_dict.get("analyzeResult", {}).get("pages", [])
@@ -102,13 +781,15 @@ class PipelineRunner:
                 content = word.get("content", "").strip()
                 confidence = word.get("confidence", 0.0)
                 if content:
-                    if confidence >= 0.85:
+                    if confidence >= LOW_CONFIDENCE:
                         words.append(content)
                     else:
                         words.append(f"[{content} | conf={confidence:.2f}]")
-        return " ".join(words)
+        return " ".join(words), confidence_stats(json_dict), result_to_text(json_dict)
 
     def _log_failure(self, folder_name: str, file_name: str, error: str):
-        self.LOGS_DIR.mkdir(parents=True, exist_ok=True)
-        with open(self.failed_log_path, "a", encoding="utf-8") as f:
-            f.write(f"[{folder_name}] {file_name} - ERRO: {error}\n")
+        # várias threads podem falhar ao mesmo tempo
+        with self._log_lock:
+            self.LOGS_DIR.mkdir(parents=True, exist_ok=True)
+            with open(self.failed_log_path, "a", encoding="utf-8") as f:
+                f.write(f"[{folder_name}] {file_name} - ERRO: {error}\n")
@@ -0,0 +1,89 @@
+import json
+import time
+import threading
+from typing import Any, Callable, Optional, TextIO
+
+
+class ProgressTracker:
+    """
+    Contadores de progresso de uma execução + eventos estruturados.
+
+    Cada evento é um dict com "event" (run_started, page_done, page_failed,
+    lote_exported, run_finished), os campos específicos e o estado geral:
+    pages_total / pages_reused / pages_done / pages_failed / pages_remaining,
+    elapsed_s e eta_s (pela vazão observada até aqui).
+    Falhas do on_event vão para `log` (o log da execução/job; padrão: print).
+    """
+
+    def __init__(
+        self,
+        on_event: Optional[Callable[[dict], None]] = None,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self.on_event = on_event
+        self.log = log or print
+        self.pages_total = 0
+        self.pages_reused = 0
+        self.pages_to_process = 0
+        self.pages_done = 0
+        self.pages_failed = 0
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def start(self, pages_total: int, pages_reused: int, **fields: Any) -> None:
+        with self._lock:
+            self.pages_total = pages_total
+            self.pages_reused = pages_reused
+            self.pages_to_process = pages_total - pages_reused
+            self.pages_done = self.pages_failed = 0
+            self._started = time.perf_counter()
+        self.emit("run_started", **fields)
+
+    def page_done(self, **fields: Any) -> None:
+        with self._lock:
+            self.pages_done += 1
+        self.emit("page_done", **fields)
+
+    def page_failed(self, **fields: Any) -> None:
+        with self._lock:
+            self.pages_failed += 1
+        self.emit("page_failed", **fields)
+
+    def state(self) -> dict:
+        with self._lock:
+            elapsed = time.perf_counter() - self._started
+            finished = self.pages_done + self.pages_failed
+            remaining = max(0, self.pages_to_process - finished)
+            eta = round(elapsed / finished * remaining, 1) if finished else None
+            return {
+                "pages_total": self.pages_total,
+                "pages_reused": self.pages_reused,
+                "pages_done": self.pages_done,
+                "pages_failed": self.pages_failed,
+                "pages_remaining": remaining,
+                "elapsed_s": round(elapsed, 3),
+                "eta_s": eta,
+            }
+
+    def emit(self, event: str, **fields: Any) -> None:
+        if self.on_event is None:
+            return
+        payload = {"event": event, "ts": time.time(), **fields, **self.state()}
+        try:
+            self.on_event(payload)
+        except Exception as e:
+            # progresso nunca derruba o pipeline
+            self.log(f"[progress] falha ao emitir evento {event}: {e}")
+
+
+def jsonl_sink(stream: TextIO) -> Callable[[dict], None]:
+    """on_event que escreve um JSON por linha (ex.: sys.stdout ou um arquivo)."""
+    lock = threading.Lock()
+
+    def write(event: dict) -> None:
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with lock:
+            stream.write(line + "\n")
+            stream.flush()
+
+    return write
@@ -0,0 +1,336 @@
+import os
+import re
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from package.RunMetrics import record
+
+
+# status que valem nova tentativa (throttling + falhas transitórias do serviço)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# erros de rede das SDKs (sem importar azure/openai aqui)
+RETRYABLE_ERRORS = {
+    "ServiceRequestError", "ServiceResponseError",    # azure.core
+    "APIConnectionError", "APITimeoutError",           # openai
+    "ConnectionError", "TimeoutError",
+}
+
+
+class TokenBucket:
+    """Balde de `rate_per_min` unidades/minuto, com rajada de até `capacity`."""
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_min / 6.0)  # ~10 s de rajada
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Reserva `amount` e devolve quanto esperar (s) até ele estar disponível."""
+        amount = min(amount, self.capacity)  # pedido maior que o balde: espera encher
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def drain(self) -> None:
+        """O serviço disse que a cota acabou: zera o balde."""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = time.monotonic()
+
+
+def parse_duration(value: Any) -> Optional[float]:
+    """Retry-After ("7", "1.5") e reset da OpenAI ("1s", "6m0s", "250ms") -> segundos."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    parts = re.findall(r"([0-9.]+)(ms|h|m|s)", text)
+    if not parts:
+        return None
+    scale = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(n) * scale[unit] for n, unit in parts)
+
+
+def retry_after_from_headers(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    if not headers:
+        return None
+    ms = headers.get("retry-after-ms") or headers.get("x-ms-retry-after-ms")
+    if ms is not None:
+        try:
+            return float(ms) / 1000.0
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after") or headers.get("Retry-After"))
+
+
+def classify_error(error: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """(vale nova tentativa?, foi throttling?, Retry-After em segundos)."""
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    if status is not None:
+        throttled = status in (429, 503)
+        return status in RETRYABLE_STATUS, throttled, retry_after_from_headers(headers)
+    return type(error).__name__ in RETRYABLE_ERRORS, False, None
+
+
+class AdaptiveLimiter:
+    """
+    Limite compartilhado por provedor: balde de requisições/min (e de
+    tokens/min, se informado) + concorrência adaptativa. Em 429/503 a
+    concorrência cai pela metade, o provedor inteiro pausa pelo Retry-After
+    e a chamada é refeita com backoff exponencial com jitter; após uma
+    sequência de sucessos a concorrência volta a subir de um em um.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_min: float,
+        tokens_per_min: Optional[float] = None,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        increase_after: int = 20,   # sucessos seguidos para +1 de concorrência
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min, capacity=tokens_per_min) if tokens_per_min else None
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.increase_after = max(1, int(increase_after))
+
+        self.concurrency = self.max_concurrency
+        self._in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._rng = random.Random()
+
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.gave_up = 0
+
+    # --- API síncrona ---
+    def call(self, fn: Callable[[], Any], tokens: float = 0) -> Any:
+        """Executa fn() respeitando os limites, refazendo em throttling/falha transitória."""
+        attempt = 0
+        while True:
+            self.acquire(tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                self.release()
+                delay = self.on_error(e, attempt)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                attempt += 1
+                continue
+            self.release(success=True)
+            return result
+
+    def acquire(self, tokens: float = 0) -> float:
+        """Bloqueia até haver vaga de concorrência e cota; devolve o tempo esperado."""
+        t0 = time.monotonic()
+        with self._cond:
+            while True:
+                wait = self._try_enter()
+                if wait is None:
+                    break
+                self._cond.wait(wait)
+
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return self._account(time.monotonic() - t0)
+
+    # --- API assíncrona (mesmos limites, esperas com asyncio.sleep) ---
+    async def call_async(self, fn: Callable[[], Any], tokens: float = 0) -> Any:
+        """Como call(), para corrotinas: fn() deve devolver um awaitable novo a cada tentativa."""
+        attempt = 0
+        while True:
+            await self.acquire_async(tokens)
+            try:
+                result = await fn()
+            except Exception as e:
+                self.release()
+                delay = self.on_error(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                self._account(delay)
+                attempt += 1
+                continue
+            self.release(success=True)
+            return result
+
+    async def acquire_async(self, tokens: float = 0) -> float:
+        t0 = time.monotonic()
+        while True:
+            with self._cond:
+                wait = self._try_enter()
+            if wait is None:
+                break
+            await asyncio.sleep(min(wait, 0.05))
+
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self._account(time.monotonic() - t0)
+
+    def release(self, success: bool = False) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            if success:
+                self._successes += 1
+                if self._successes >= self.increase_after and self.concurrency < self.max_concurrency:
+                    self.concurrency += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+    def on_error(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Ajusta os limites após uma falha; devolve o atraso até a nova tentativa (None = desistir)."""
+        retryable, throttled, retry_after = classify_error(error)
+        if not retryable:
+            return None
+        if attempt >= self.max_retries:
+            with self._cond:
+                self.gave_up += 1
+            return None
+
+        # full jitter: espalha as novas tentativas dos workers
+        delay = self._rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        record("ratelimit.retry", 0.0, provider=self.name, retries=1, throttled=int(throttled))
+        with self._cond:
+            self.retries += 1
+            self._successes = 0
+            if throttled:
+                self.throttled += 1
+                self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+                self.requests.drain()
+                if retry_after is not None:
+                    # o serviço disse quanto esperar: vale para todas as chamadas do provedor
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                    delay = max(delay, retry_after)
+        return delay
+
+    def observe_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Cabeçalhos x-ratelimit-* de respostas OK: cota no fim -> pausa até o reset."""
+        if not headers:
+            return
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if remaining is None or reset is None:
+                continue
+            try:
+                if int(float(remaining)) > 0:
+                    continue
+            except ValueError:
+                continue
+            if bucket is not None:
+                bucket.drain()
+            with self._cond:
+                self._paused_until = max(self._paused_until, time.monotonic() + reset)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "gave_up": self.gave_up,
+                "throttled_s": round(self.throttled_seconds, 3),
+                "concurrency": self.concurrency,
+            }
+
+    # --- internos ---
+    def _try_enter(self) -> Optional[float]:
+        # chamado com self._cond adquirido: None = entrou; senão, quanto esperar
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            return pause
+        if self._in_flight >= self.concurrency:
+            return 1.0
+        self._in_flight += 1
+        self.calls += 1
+        return None
+
+    def _reserve(self, tokens: float) -> float:
+        wait = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def _sleep(self, delay: float) -> None:
+        time.sleep(delay)
+        self._account(delay)
+
+    def _account(self, waited: float) -> float:
+        if waited > 0.001:
+            with self._cond:
+                self.throttled_seconds += waited
+            record("ratelimit.wait", waited, provider=self.name)
+        return waited
+
+
+_LIMITERS: Dict[str, AdaptiveLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def limiter_for(provider: str) -> AdaptiveLimiter:
+    """
+    Limitador único por provedor no processo (todos os clientes/jobs dividem
+    a mesma cota). Limites via env: AZURE_OCR_RPM / AZURE_OCR_MAX_CONCURRENCY,
+    OPENAI_RPM / OPENAI_TPM / OPENAI_MAX_CONCURRENCY.
+    """
+    with _LIMITERS_LOCK:
+        if provider not in _LIMITERS:
+            if provider == "azure_ocr":
+                # S0: 15 análises/s; metade disso deixa folga para os GETs de polling
+                limiter = AdaptiveLimiter(
+                    provider,
+                    requests_per_min=_env_float("AZURE_OCR_RPM", 450),
+                    # análises em polling não contam na cota de envio: o cliente
+                    # assíncrono mantém dezenas em voo
+                    max_concurrency=int(_env_float("AZURE_OCR_MAX_CONCURRENCY", 32)),
+                )
+            elif provider == "openai":
+                limiter = AdaptiveLimiter(
+                    provider,
+                    requests_per_min=_env_float("OPENAI_RPM", 500),
+                    tokens_per_min=_env_float("OPENAI_TPM", 200_000),
+                    max_concurrency=int(_env_float("OPENAI_MAX_CONCURRENCY", 8)),
+                )
+            else:
+                limiter = AdaptiveLimiter(provider, requests_per_min=60)
+            _LIMITERS[provider] = limiter
+        return _LIMITERS[provider]
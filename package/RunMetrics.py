@@ -0,0 +1,158 @@
+import json
+import time
+import cProfile
+import pstats
+import threading
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+# métricas da execução em andamento + rótulos da página atual (lote/arquivo);
+# os estágios do PipelineRunner fazem o bind em cada worker
+_current: contextvars.ContextVar = contextvars.ContextVar("run_metrics", default=None)
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank sobre uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class RunMetrics:
+    """
+    Amostras por página e por etapa (ocr.submit, ocr.poll, llm.request,
+    docx.save, ...): duração + campos numéricos livres (bytes, tokens,
+    retries). summary() agrega contagem, total e percentis por etapa.
+    """
+
+    def __init__(self):
+        self.samples: List[dict] = []
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def record(self, stage: str, seconds: float, **fields: Any) -> None:
+        sample = {"stage": stage, "seconds": round(seconds, 6), **fields}
+        with self._lock:
+            self.samples.append(sample)
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            samples = list(self.samples)
+
+        by_stage: Dict[str, List[dict]] = defaultdict(list)
+        for sample in samples:
+            by_stage[sample["stage"]].append(sample)
+
+        out = {}
+        for stage, items in sorted(by_stage.items()):
+            durations = sorted(s["seconds"] for s in items)
+            entry = {
+                "count": len(items),
+                "total_s": round(sum(durations), 3),
+                "mean_s": round(sum(durations) / len(durations), 4),
+                **{f"p{p}_s": round(percentile(durations, p), 4) for p in PERCENTILES},
+                "max_s": round(durations[-1], 4),
+            }
+            # soma os campos numéricos (bytes, tokens, retries...)
+            totals: Dict[str, float] = {}
+            for s in items:
+                for key, value in s.items():
+                    if key not in ("stage", "seconds") and isinstance(value, (int, float)) and not isinstance(value, bool):
+                        totals[key] = totals.get(key, 0) + value
+            entry.update({key: round(value, 3) if isinstance(value, float) else value for key, value in sorted(totals.items())})
+            out[stage] = entry
+        return out
+
+    def write(self, path: Path, extra: Optional[dict] = None) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            samples = list(self.samples)
+        report = {
+            "started_at": self._started,
+            "finished_at": time.time(),
+            **(extra or {}),
+            "stages": self.summary(),
+            "samples": samples,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        return path
+
+
+@contextmanager
+def bind(metrics: Optional[RunMetrics], **labels: Any) -> Iterator[None]:
+    """Ativa `metrics` (e rótulos como lote/arquivo) para o código chamado dentro do bloco."""
+    token = _current.set((metrics, labels) if metrics is not None else None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def record(stage: str, seconds: float, **fields: Any) -> None:
+    """Registra uma amostra nas métricas ativas (sem bind, não faz nada)."""
+    current = _current.get()
+    if current is None:
+        return
+    metrics, labels = current
+    metrics.record(stage, seconds, **labels, **fields)
+
+
+@contextmanager
+def timed(stage: str, **fields: Any) -> Iterator[dict]:
+    """
+    Mede o bloco e registra em `stage`. O dict devolvido aceita campos
+    conhecidos só no fim (ex.: tokens da resposta).
+    """
+    extra: dict = dict(fields)
+    t0 = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        record(stage, time.perf_counter() - t0, **extra)
+
+
+class ThreadProfiler:
+    """
+    cProfile só enxerga a thread onde foi ligado: mantém um perfil por
+    thread (os workers dos estágios) e junta todos num .prof no final.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        prof = getattr(self._local, "profile", None)
+        if prof is None:
+            prof = cProfile.Profile()
+            self._local.profile = prof
+            with self._lock:
+                self._profiles.append(prof)
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+
+    def dump(self, path: Path) -> Optional[Path]:
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for prof in profiles[1:]:
+            stats.add(prof)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(path))
+        return Path(path)
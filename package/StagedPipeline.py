@@ -0,0 +1,183 @@
+import time
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+
+# marca fim de fluxo entre estágios
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    workers: int
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+    _depth_sum: int = 0
+    _depth_samples: int = 0
+
+    def as_dict(self, elapsed: float, queue_depth: int) -> dict:
+        capacity = max(elapsed * self.workers, 1e-9)
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "queue_depth": queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "mean_queue_depth": round(self._depth_sum / self._depth_samples, 2) if self._depth_samples else 0.0,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilization": round(self.busy_seconds / capacity, 3),
+            "throughput_per_s": round(self.processed / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+
+
+class StagedPipeline:
+    """
+    Estágios encadeados por filas limitadas (backpressure), cada um com seu
+    próprio número de workers. Cada estágio recebe (item, valor_anterior) e
+    devolve o valor para o próximo. Se um estágio falhar, o item sai do fluxo
+    e vai para on_error(item, nome_do_estagio, exc); itens que passam por
+    todos os estágios vão para on_result(item, resultado) assim que terminam.
+    Exceções nos callbacks vão para `log` (padrão: print) e não derrubam o
+    worker: o fim de fluxo sempre chega ao próximo estágio.
+    """
+
+    def __init__(
+        self,
+        stages: List[Tuple[str, Callable[[Any, Any], Any], int]],
+        queue_size: int = 8,
+        on_error: Optional[Callable[[Any, str, Exception], None]] = None,
+        on_result: Optional[Callable[[Any, Any], None]] = None,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        if not stages:
+            raise ValueError("Informe ao menos um estágio.")
+        self.stages = [(name, fn, max(1, int(workers))) for name, fn, workers in stages]
+        self.queue_size = max(1, int(queue_size))
+        self.on_error = on_error
+        self.on_result = on_result
+        self.log = log or print
+
+        self._queues: List[queue.Queue] = []
+        self._stats = {name: StageStats(name, workers) for name, _, workers in self.stages}
+        self._lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    def run(self, items: Iterable[Any]) -> List[Tuple[Any, Any]]:
+        """Processa todos os itens e devolve [(item, resultado_final)] (ordem de término)."""
+        # fila de entrada de cada estágio; todas limitadas
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results: List[Tuple[Any, Any]] = []
+        remaining = [workers for _, _, workers in self.stages]
+        self._started_at = time.perf_counter()
+        self._finished_at = None
+
+        def feeder():
+            first = self._queues[0]
+            try:
+                for item in items:
+                    self._put(0, (item, None))
+            except Exception as e:
+                self.log(f"[pipeline] falha ao ler os itens de entrada: {e}")
+            finally:
+                for _ in range(self.stages[0][2]):
+                    first.put(_DONE)
+
+        def callback(label: str, fn: Callable, *args) -> None:
+            # erro num callback (ex.: disco cheio ao gravar o log de falhas) não pode parar o worker
+            try:
+                fn(*args)
+            except Exception as e:
+                self.log(f"[pipeline] falha em {label}: {e}")
+
+        def worker(idx: int):
+            name, fn, _ = self.stages[idx]
+            stats = self._stats[name]
+            inbox = self._queues[idx]
+            is_last = idx == len(self.stages) - 1
+
+            try:
+                while True:
+                    msg = inbox.get()
+                    if msg is _DONE:
+                        break
+                    item, value = msg
+                    t0 = time.perf_counter()
+                    try:
+                        out = fn(item, value)
+                    except Exception as e:
+                        with self._lock:
+                            stats.busy_seconds += time.perf_counter() - t0
+                            stats.failed += 1
+                        if self.on_error:
+                            callback("on_error", self.on_error, item, name, e)
+                        continue
+
+                    with self._lock:
+                        stats.busy_seconds += time.perf_counter() - t0
+                        stats.processed += 1
+
+                    if is_last:
+                        with self._lock:
+                            results.append((item, out))
+                        if self.on_result:
+                            callback("on_result", self.on_result, item, out)
+                    else:
+                        # bloqueia se o próximo estágio estiver atrasado (backpressure)
+                        self._put(idx + 1, (item, out))
+            finally:
+                # último worker do estágio avisa o próximo
+                with self._lock:
+                    remaining[idx] -= 1
+                    last_out = remaining[idx] == 0
+                if last_out and not is_last:
+                    for _ in range(self.stages[idx + 1][2]):
+                        self._queues[idx + 1].put(_DONE)
+
+        threads = [threading.Thread(target=feeder, name="stage-feeder", daemon=True)]
+        for idx, (name, _, workers) in enumerate(self.stages):
+            threads += [
+                threading.Thread(target=worker, args=(idx,), name=f"stage-{name}-{n}", daemon=True)
+                for n in range(workers)
+            ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self._finished_at = time.perf_counter()
+        return results
+
+    def _put(self, idx: int, msg) -> None:
+        q = self._queues[idx]
+        q.put(msg)
+        stats = self._stats[self.stages[idx][0]]
+        depth = q.qsize()
+        with self._lock:
+            stats.max_queue_depth = max(stats.max_queue_depth, depth)
+            stats._depth_sum += depth
+            stats._depth_samples += 1
+
+    def snapshot(self) -> dict:
+        """Profundidade das filas e vazão por estágio (pode ser chamado durante a execução)."""
+        if self._started_at is None:
+            return {}
+        end = self._finished_at or time.perf_counter()
+        elapsed = end - self._started_at
+        with self._lock:
+            return {
+                name: self._stats[name].as_dict(elapsed, self._queues[idx].qsize() if self._queues else 0)
+                for idx, (name, _, _) in enumerate(self.stages)
+            }
+
+    def bottleneck(self) -> Optional[str]:
+        """Estágio com maior utilização (tempo ocupado / capacidade)."""
+        snap = self.snapshot()
+        if not snap:
+            return None
+        return max(snap, key=lambda name: snap[name]["utilization"])
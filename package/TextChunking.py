@@ -0,0 +1,77 @@
+import re
+from typing import Dict, List
+
+
+# marcador estável entre páginas de uma requisição agrupada
+PAGE_MARKER = "<<<PAGINA {n}>>>"
+PAGE_MARKER_RE = re.compile(r"<<<\s*PAGINA\s+(\d+)\s*>>>")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata (~4 caracteres por token), suficiente para dimensionar requisições."""
+    return len(text) // 4 + 1
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Quebra um texto grande em pedaços de até max_tokens, preferindo
+    fronteiras de parágrafo, depois de linha e, em último caso, de caracteres.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    max_chars = max(1, max_tokens * 4)
+    chunks: List[str] = []
+    current = ""
+
+    def units(block: str) -> List[str]:
+        if len(block) <= max_chars:
+            return [block]
+        lines = block.split("\n")
+        if len(lines) > 1:
+            return [u for line in lines for u in units(line)]
+        return [block[i:i + max_chars] for i in range(0, len(block), max_chars)]
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        for unit in units(paragraph):
+            sep = "\n\n" if current else ""
+            if current and len(current) + len(sep) + len(unit) > max_chars:
+                chunks.append(current)
+                current, sep = "", ""
+            current += sep + unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack_pages(texts: List[str], max_tokens: int, max_pages: int = 8) -> List[List[int]]:
+    """Agrupa índices de páginas consecutivas em lotes que cabem no orçamento de tokens."""
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text) + 8  # marcador
+        if current and (used + cost > max_tokens or len(current) >= max_pages):
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def join_pages(texts: List[str]) -> str:
+    return "\n\n".join(f"{PAGE_MARKER.format(n=i + 1)}\n{text}" for i, text in enumerate(texts))
+
+
+def split_pages(output: str, expected: int) -> Dict[int, str]:
+    """Separa a resposta agrupada de volta por página (índice 0..expected-1)."""
+    parts = PAGE_MARKER_RE.split(output)
+    pages: Dict[int, str] = {}
+    # parts = [antes, n1, texto1, n2, texto2, ...]
+    for number, body in zip(parts[1::2], parts[2::2]):
+        idx = int(number) - 1
+        if 0 <= idx < expected and idx not in pages:
+            pages[idx] = body.strip()
+    return pages
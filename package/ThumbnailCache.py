@@ -0,0 +1,130 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from package.DiskCache import DiskCache, CACHE_ROOT
+
+
+THUMB_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+
+def thumbnail_to_cache(src: str, cache_dir: str, size: int = 320, quality: int = 70) -> str:
+    """
+    Miniatura JPEG de `src` em cache_dir, endereçada pelo conteúdo + tamanho
+    (sobrevive às renomeações do "Aplicar ordem"). Se já existir, só devolve o caminho.
+    """
+    from PIL import Image, ImageOps
+
+    key = DiskCache.make_file_key(f"thumb-v1:{size}:{quality}", file_path=src)
+    out = Path(cache_dir) / key[:2] / f"{key}.jpg"
+    if out.exists():
+        os.utime(out)  # LRU, como no DiskCache
+        return str(out)
+
+    with Image.open(src) as img:
+        # JPEG: decodifica direto em 1/2..1/8 da resolução (bem mais barato que abrir inteiro)
+        img.draft("RGB", (size * 2, size * 2))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(f"{out.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        img.save(tmp, format="JPEG", quality=quality, optimize=True)
+    os.replace(tmp, out)
+    return str(out)
+
+
+class ThumbnailCache:
+    """
+    Miniaturas para a grade de pré-visualização do app: geradas uma vez por
+    imagem, em segundo plano (threads: com draft() a decodificação é curta e
+    não compensa um pool de processos), e servidas do disco nos reruns.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path, None] = None,
+        size: int = 320,
+        quality: int = 70,
+        max_workers: int = 2,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else CACHE_ROOT / "thumbs"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.size = int(size)
+        self.quality = int(quality)
+        self.max_bytes = int(max_bytes)
+
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="thumbs")
+        # memo por (caminho, tamanho, mtime): arquivo substituído com o mesmo nome gera outra miniatura
+        self._futures: Dict[tuple, Future] = {}
+        self._new_since_evict = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supports(path: Union[str, Path]) -> bool:
+        return Path(path).suffix.lower() in THUMB_EXTENSIONS
+
+    def submit(self, paths: Iterable[Union[str, Path]]) -> None:
+        """Agenda as miniaturas em segundo plano (o app chama logo após o upload)."""
+        for path in paths:
+            if self.supports(path):
+                try:
+                    self._future_for(str(path))
+                except FileNotFoundError:
+                    continue
+
+    def get(self, path: Union[str, Path], timeout: Optional[float] = 0.0) -> Optional[str]:
+        """
+        Caminho da miniatura; se ainda não estiver pronta em `timeout`
+        segundos (None = espera), devolve None e a geração segue em segundo plano.
+        """
+        path = str(path)
+        if not self.supports(path):
+            return None
+        try:
+            future = self._future_for(path)
+            thumb = future.result(timeout=timeout)
+        except FutureTimeout:
+            return None
+        except Exception:
+            return None  # imagem ilegível/removida: a grade mostra só o nome
+        if not os.path.exists(thumb):
+            # removida pela limpeza do cache depois de memorizada: refaz
+            with self._lock:
+                self._futures = {k: f for k, f in self._futures.items() if f is not future}
+            return self.get(path, timeout)
+        return thumb
+
+    def _future_for(self, path: str) -> Future:
+        st = os.stat(path)
+        memo_key = (path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            future = self._futures.get(memo_key)
+            if future is None:
+                future = self._pool.submit(thumbnail_to_cache, path, str(self.cache_dir), self.size, self.quality)
+                self._futures[memo_key] = future
+                self._new_since_evict += 1
+                if self._new_since_evict >= 200:
+                    self._new_since_evict = 0
+                    self._pool.submit(self._evict)
+            return future
+
+    def _evict(self) -> None:
+        entries = []
+        for p in self.cache_dir.glob("*/*.jpg"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,228 @@
+import io
+import os
+import json
+import shutil
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+def ingest_bytes(data: bytes, dest: str, quality: int = 95) -> dict:
+    """
+    Roda no processo filho: grava o upload como JPEG em `dest`. JPEG RGB/cinza
+    sem rotação no EXIF vai byte a byte; o resto é girado, convertido para RGB
+    e recomprimido (comportamento antigo do save_uploads).
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as img:
+        orientation = img.getexif().get(0x0112, 1)
+        passthrough = img.format == "JPEG" and img.mode in ("RGB", "L") and orientation in (0, 1)
+        out = None if passthrough else ImageOps.exif_transpose(img).convert("RGB")
+
+    dest = Path(dest)
+    tmp = dest.with_name(f"__tmp__{dest.name}.{os.getpid()}")  # __tmp__ fica fora de list_images
+    if passthrough:
+        tmp.write_bytes(data)
+    else:
+        out.save(tmp, format="JPEG", quality=quality)
+    os.replace(tmp, dest)
+    return {"path": str(dest), "reencoded": not passthrough, "bytes_in": len(data), "bytes_out": dest.stat().st_size}
+
+
+class UploadIndex:
+    """
+    sha256 do conteúdo -> imagem já gravada em images/<lote>/ (JSON em
+    images/.upload_index.json). Guarda o hash do upload original e o do
+    arquivo gravado; a entrada só vale se tamanho e mtime ainda batem e se o
+    hash pedido ainda é um dos dois do arquivo (regravar o mesmo nome com
+    outro conteúdo invalida os hashes antigos).
+    """
+
+    def __init__(self, images_dir: Union[str, Path]):
+        self.images_dir = Path(images_dir)
+        self.path = self.images_dir / ".upload_index.json"
+        self._by_hash: Dict[str, str] = {}
+        # caminho relativo -> [tamanho, mtime_ns, sha do arquivo, sha do upload]
+        self._files: Dict[str, list] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._by_hash = data.get("by_hash", {})
+            self._files = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, sha: str) -> Optional[Path]:
+        rel = self._by_hash.get(sha)
+        if rel is None or not self._valid(rel) or sha not in self._files[rel][2:]:
+            return None
+        return self.images_dir / rel
+
+    def add(self, sha: str, path: Union[str, Path], file_sha: Optional[str] = None) -> None:
+        path = Path(path)
+        rel = path.relative_to(self.images_dir).as_posix()
+        st = path.stat()
+        file_sha = file_sha or sha
+        # o arquivo pode ter sido regravado com outro conteúdo: hashes antigos não apontam mais para ele
+        self._by_hash = {h: r for h, r in self._by_hash.items() if r != rel}
+        self._files[rel] = [st.st_size, st.st_mtime_ns, file_sha, sha]
+        self._by_hash[sha] = rel
+        self._by_hash[file_sha] = rel
+
+    def file_sha(self, path: Union[str, Path]) -> Optional[str]:
+        """sha256 do arquivo gravado (pode diferir do upload, se foi recomprimido)."""
+        entry = self._files.get(Path(path).relative_to(self.images_dir).as_posix())
+        return entry[2] if entry else None
+
+    def scan(self, lote_dir: Union[str, Path], extensions: Iterable[str] = (".jpg", ".jpeg", ".png")) -> None:
+        """Indexa imagens do lote gravadas antes do índice existir (ou alteradas desde então)."""
+        for p in Path(lote_dir).iterdir():
+            if not p.is_file() or p.suffix.lower() not in extensions or p.name.startswith("__tmp__"):
+                continue
+            rel = p.relative_to(self.images_dir).as_posix()
+            if not self._valid(rel):
+                self.add(file_sha256(p), p)
+
+    def save(self) -> None:
+        # entradas de arquivos que sumiram (lote apagado, wipe) saem aqui
+        self._files = {rel: v for rel, v in self._files.items() if (self.images_dir / rel).exists()}
+        self._by_hash = {sha: rel for sha, rel in self._by_hash.items() if rel in self._files}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"by_hash": self._by_hash, "files": self._files}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _valid(self, rel: str) -> bool:
+        entry = self._files.get(rel)
+        if entry is None:
+            return False
+        try:
+            st = (self.images_dir / rel).stat()
+        except FileNotFoundError:
+            return False
+        return [st.st_size, st.st_mtime_ns] == entry[:2]
+
+
+def _unique_name(name: str, taken: set) -> str:
+    """scan.jpg, scan_1.jpg, scan_2.jpg... o primeiro livre (comparação sem caixa); reserva em `taken`."""
+    stem, suffix = Path(name).stem, Path(name).suffix
+    candidate, n = name, 0
+    while candidate.lower() in taken:
+        n += 1
+        candidate = f"{stem}_{n}{suffix}"
+    taken.add(candidate.lower())
+    return candidate
+
+
+def file_sha256(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class UploadIngestor:
+    """
+    Grava uploads em images/<lote>/ num pool de processos (decodificar e
+    recomprimir fotos grandes é CPU puro), com deduplicação por sha256:
+    - o mesmo conteúdo já no lote (ou repetido no envio) é ignorado;
+    - conteúdo já gravado em outro lote vira hardlink (cópia, se o sistema
+      de arquivos não suportar), sem recodificar; o OCR também não se repete,
+      já que os caches de OCR/pré-processamento são por conteúdo.
+    """
+
+    def __init__(self, images_dir: Union[str, Path], max_workers: Optional[int] = None, quality: int = 95):
+        self.images_dir = Path(images_dir)
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.quality = quality
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()  # um ingest por vez (o índice é um arquivo só)
+
+    def ingest(
+        self,
+        lote_dir: Union[str, Path],
+        uploads: Iterable[Tuple[str, bytes]],
+        on_progress: Optional[Callable[[int, int, str], None]] = None,
+    ) -> List[dict]:
+        """
+        uploads: (nome original, bytes). Devolve um dict por upload com
+        name, status ("saved" | "linked" | "duplicate" | "failed"), path,
+        sha256, reencoded e error; on_progress(feitos, total, nome) a cada arquivo.
+        Conteúdo novo cujo nome (já com .jpg) colide com um arquivo do lote ou
+        com outro upload do envio vira nome_1.jpg, nome_2.jpg...: dois uploads
+        nunca são gravados no mesmo caminho.
+        """
+        lote_dir = Path(lote_dir)
+        uploads = list(uploads)
+        total = len(uploads)
+        results: List[dict] = []
+        done = 0
+
+        def progress(result: dict):
+            nonlocal done
+            done += 1
+            results.append(result)
+            if on_progress is not None:
+                on_progress(done, total, result["name"])
+
+        with self._lock:
+            index = UploadIndex(self.images_dir)
+            index.scan(lote_dir)
+            seen: Dict[str, str] = {}
+            taken = {p.name.lower() for p in lote_dir.iterdir()}
+            pending = {}
+            for name, data in uploads:
+                out_name = Path(name).with_suffix(".jpg").name  # normaliza extensão
+                sha = hashlib.sha256(data).hexdigest()
+                result = {"name": out_name, "source": name, "sha256": sha, "status": "saved",
+                          "path": None, "reencoded": False, "error": None}
+                existing = index.lookup(sha)
+                if sha in seen or (existing is not None and existing.parent == lote_dir):
+                    result.update(status="duplicate", path=seen.get(sha) or str(existing))
+                    progress(result)
+                    continue
+                out_name = _unique_name(out_name, taken)
+                result["name"] = out_name
+                seen[sha] = str(lote_dir / out_name)
+                if existing is not None:
+                    dest = lote_dir / out_name
+                    try:
+                        try:
+                            os.link(existing, dest)
+                        except OSError:
+                            shutil.copy2(existing, dest)
+                        index.add(sha, dest, index.file_sha(existing))
+                        result.update(status="linked", path=str(dest))
+                    except Exception as e:
+                        result.update(status="failed", error=str(e))
+                    progress(result)
+                    continue
+                future = self._get_pool().submit(ingest_bytes, data, str(lote_dir / out_name), self.quality)
+                pending[future] = result
+
+            for future in as_completed(pending):
+                result = pending[future]
+                try:
+                    info = future.result()
+                    file_sha = None if not info["reencoded"] else file_sha256(info["path"])
+                    index.add(result["sha256"], info["path"], file_sha)
+                    result.update(path=info["path"], reencoded=info["reencoded"])
+                except Exception as e:
+                    result.update(status="failed", error=str(e))
+                progress(result)
+            index.save()
+        return results
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: o Streamlit tem threads rodando, fork não é seguro
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def close(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
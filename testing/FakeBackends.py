@@ -0,0 +1,251 @@
+import random
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from package.AzureOCRfile import write_sidecars, result_to_text
+from package.CorrectionPolicy import strip_confidence_markers
+from package.DiskCache import DiskCache
+from package.RunMetrics import timed
+from package.TextChunking import estimate_tokens, pack_pages
+
+
+class LatencyModel:
+    """
+    Latência simulada: lognormal em torno de `median` (segundos), com
+    cauda controlada por `sigma`, mais um custo proporcional ao tamanho.
+    """
+
+    def __init__(self, median: float = 0.5, sigma: float = 0.4, per_mb: float = 0.0, seed: Optional[int] = None):
+        self.median = median
+        self.sigma = sigma
+        self.per_mb = per_mb
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, size_bytes: int = 0) -> float:
+        with self._lock:
+            base = self.median * self._rng.lognormvariate(0.0, self.sigma) if self.median > 0 else 0.0
+        return base + self.per_mb * size_bytes / (1024 * 1024)
+
+    def sleep(self, size_bytes: int = 0) -> float:
+        seconds = self.sample(size_bytes)
+        if seconds > 0:
+            time.sleep(seconds)
+        return seconds
+
+
+class FakeBackendError(RuntimeError):
+    pass
+
+
+def synthetic_analyze_result(document: bytes, words_per_page: int = 250, low_conf_share: float = 0.08,
+                             model_id: str = "prebuilt-read") -> dict:
+    """
+    analyzeResult com o formato do Document Intelligence (páginas, linhas,
+    palavras com confiança e spans), determinístico pelo conteúdo.
+    """
+    rng = random.Random(hashlib.sha256(document).digest())
+    words, offset = [], 0
+    for _ in range(words_per_page):
+        text = "".join(rng.choice("abcdefghijlmnoprstuvxzáéçõ") for _ in range(rng.randint(2, 11)))
+        confidence = round(rng.uniform(0.30, 0.84) if rng.random() < low_conf_share else rng.uniform(0.86, 0.999), 3)
+        words.append({"content": text, "confidence": confidence, "span": {"offset": offset, "length": len(text)}})
+        offset += len(text) + 1
+
+    lines = []
+    for start in range(0, len(words), 12):
+        chunk = words[start:start + 12]
+        lines.append({
+            "content": " ".join(w["content"] for w in chunk),
+            "polygon": [1.0, 1.0 + len(lines) * 0.25, 7.5, 1.0 + len(lines) * 0.25, 7.5, 1.2 + len(lines) * 0.25, 1.0, 1.2 + len(lines) * 0.25],
+            "spans": [{"offset": chunk[0]["span"]["offset"], "length": chunk[-1]["span"]["offset"] + chunk[-1]["span"]["length"] - chunk[0]["span"]["offset"]}],
+        })
+
+    content = " ".join(w["content"] for w in words)
+    return {
+        "apiVersion": "2024-02-29-preview",
+        "modelId": model_id,
+        "stringIndexType": "textElements",
+        "content": content,
+        "pages": [{
+            "pageNumber": 1,
+            "angle": 0,
+            "width": 8.5,
+            "height": 11.0,
+            "unit": "inch",
+            "words": words,
+            "lines": lines,
+            "spans": [{"offset": 0, "length": len(content)}],
+        }],
+        "styles": [],
+        "contentFormat": "text",
+    }
+
+
+class FakeOCRClient:
+    """
+    Substituto offline do AzureOCRClient (mesma interface usada pelo
+    PipelineRunner): latência configurável, falhas aleatórias e JSON realista.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        failure_rate: float = 0.0,
+        words_per_page: int = 250,
+        low_conf_share: float = 0.08,
+        model_id: str = "prebuilt-read",
+        cache: Optional[DiskCache] = None,
+        pages_per_request: int = 1,
+        sidecar_format: str = "words",
+        seed: Optional[int] = None,
+    ):
+        self.sidecar_format = sidecar_format
+        self.latency = latency or LatencyModel(median=1.5, sigma=0.35, per_mb=0.4, seed=seed)
+        self.failure_rate = failure_rate
+        self.words_per_page = words_per_page
+        self.low_conf_share = low_conf_share
+        self.model_id = model_id
+        self.cache = cache
+        self.pages_per_request = max(1, int(pages_per_request))
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def extract_text(self, file_path: str, save_json: bool = True, upload_path: Optional[str] = None) -> str:
+        result_dict = self._analyze(upload_path or file_path)
+        if save_json:
+            write_sidecars(file_path, result_dict, self.sidecar_format, self.cache is not None)
+        return result_to_text(result_dict)
+
+    def extract_raw_json(self, file_path: str) -> dict:
+        return self._analyze(file_path)
+
+    def extract_text_batch(self, file_paths: List[str], save_json: bool = True, pages_per_request: Optional[int] = None,
+                           upload_paths: Optional[List[str]] = None) -> List[str]:
+        results = []
+        datas = [Path(p).read_bytes() for p in (upload_paths or file_paths)]
+        # um único "request" para o grupo inteiro
+        self._request(sum(len(d) for d in datas))
+        for file_path, data in zip(file_paths, datas):
+            result_dict = synthetic_analyze_result(data, self.words_per_page, self.low_conf_share, self.model_id)
+            if save_json:
+                write_sidecars(file_path, result_dict, self.sidecar_format, self.cache is not None)
+            results.append(result_to_text(result_dict))
+        return results
+
+    def _analyze(self, file_path: str) -> dict:
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache_key_for(file_path)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        data = Path(file_path).read_bytes()
+        self._request(len(data))
+        result_dict = synthetic_analyze_result(data, self.words_per_page, self.low_conf_share, self.model_id)
+        if cache_key is not None:
+            self.cache.set(cache_key, result_dict)
+        return result_dict
+
+    def _request(self, size: int) -> None:
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.failure_rate
+        with timed("ocr.submit", bytes=size):
+            self.latency.sleep(size)
+        if fail:
+            raise FakeBackendError("falha simulada do OCR (HTTP 500)")
+
+    def cache_key_for(self, file_path: str) -> str:
+        return DiskCache.make_file_key(self.model_id, file_path=file_path)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+
+class FakeTextCorrector:
+    """
+    Substituto offline do OpenAITextCorrector: latência por requisição +
+    por token de saída, falhas aleatórias, devolve o texto sem marcadores.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        per_output_token: float = 0.004,
+        failure_rate: float = 0.0,
+        token_budget: int = 6000,
+        batch_max_pages: int = 8,
+        model: str = "fake-llm",
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency or LatencyModel(median=0.8, sigma=0.5, seed=seed)
+        self.per_output_token = per_output_token
+        self.failure_rate = failure_rate
+        self.token_budget = token_budget
+        self.batch_max_pages = batch_max_pages
+        self.model = model
+        self.system_prompt = "fake"
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def correct_text(self, raw_text: str) -> str:
+        return self._complete([raw_text])[0]
+
+    def correct_texts(self, texts: List[str]) -> List[str]:
+        results: List[Optional[str]] = [None] * len(texts)
+        for group in pack_pages(texts, self.token_budget, self.batch_max_pages):
+            for i, output in zip(group, self._complete([texts[i] for i in group])):
+                results[i] = output
+        return results
+
+    def _complete(self, texts: List[str]) -> List[str]:
+        tokens = sum(estimate_tokens(t) for t in texts)
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.failure_rate
+        with timed("llm.request", model=self.model, prompt_tokens=tokens, completion_tokens=tokens):
+            self.latency.sleep()
+            time.sleep(self.per_output_token * tokens)
+        if fail:
+            raise FakeBackendError("falha simulada do LLM (HTTP 429)")
+        return [strip_confidence_markers(t) for t in texts]
+
+    def cache_stats(self) -> dict:
+        return {}
+
+
+def write_synthetic_lote(folder: Path, pages: int, image_kb: int, seed: int = 0) -> List[Path]:
+    """Cria `pages` arquivos .jpg de ~image_kb KB (conteúdo aleatório, nomes 1..N)."""
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(1, pages + 1):
+        path = folder / f"{i}.jpg"
+        size = max(1, int(image_kb * 1024 * rng.uniform(0.7, 1.3)))
+        path.write_bytes(rng.randbytes(size))
+        paths.append(path)
+    return paths
+
+
+def write_synthetic_photo_lote(folder: Path, pages: int, megapixels: float = 12.0, seed: int = 0) -> List[Path]:
+    """Como write_synthetic_lote, mas com JPEGs de verdade (ruído tipo foto de celular, 4:3, qualidade 95)."""
+    from PIL import Image
+
+    folder.mkdir(parents=True, exist_ok=True)
+    height = int((megapixels * 1_000_000 * 3 / 4) ** 0.5)
+    width = int(height * 4 / 3)
+    paths = []
+    for i in range(1, pages + 1):
+        sigma = 20 + (seed + i) % 20
+        channels = [Image.effect_noise((width, height), sigma).point(lambda v, o=o: min(255, v + o)) for o in (60, 50, 40)]
+        path = folder / f"{i}.jpg"
+        Image.merge("RGB", channels).save(path, format="JPEG", quality=95)
+        paths.append(path)
+    return paths
@@ -0,0 +1,94 @@
+"""
+Verificação offline do caminho assíncrono de OCR: AsyncAzureOCRClient com
+o FakeAsyncAnalyzeTransport (analyze -> Operation-Location -> polling em
+processo, sem rede) dentro do PipelineRunner, via AsyncBridge.
+
+    python -m testing.check_async_ocr
+    python -m testing.check_async_ocr --pages 40 --latency 0.05
+
+Confere que todas as páginas saem, que as análises ficam em polling ao
+mesmo tempo, que as métricas do OCR (ocr.submit/ocr.poll) chegam ao
+RunMetrics da execução e que uma segunda rodada com --force-ocr sai do
+cache. Sai com código 1 se alguma verificação falhar.
+"""
+import sys
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+from package.AsyncAzureOCRfile import AsyncAzureOCRClient
+from package.DiskCache import DiskCache
+from package.PipelineRunner import PipelineRunner
+from testing.FakeAzureTransport import FakeAsyncAnalyzeTransport
+
+
+class EchoCorrector:
+    def correct_text(self, text: str) -> str:
+        return text
+
+
+class MemoryExporter:
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+        self.documents = {}
+
+    def save_text_to_docx(self, text: str, filename: str = "documento.docx") -> Path:
+        self.documents[filename] = text
+        return self.output_dir / filename
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Verificação offline do OCR assíncrono.")
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--latency", type=float, default=0.02, help="Segundos por requisição HTTP simulada.")
+    parser.add_argument("--workers", type=int, default=8, help="Workers do estágio de OCR.")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    root = Path(tempfile.mkdtemp(prefix="check_async_ocr_"))
+    checks = []
+    try:
+        lote = root / "images" / "lote"
+        lote.mkdir(parents=True)
+        for i in range(args.pages):
+            (lote / f"{i:03d}.jpg").write_bytes(f"pagina {i}".encode("utf-8"))
+
+        transport = FakeAsyncAnalyzeTransport(latency=args.latency, polls_before_done=2)
+        ocr = AsyncAzureOCRClient(
+            endpoint="https://offline.cognitiveservices.azure.com", key="offline",
+            transport=transport, cache=DiskCache(root / "cache"), polling_interval=0,
+        )
+        exporter = MemoryExporter(root / "output")
+        runner = PipelineRunner(
+            ocr, EchoCorrector(), exporter,
+            base_dir=str(root / "images"), output_dir=str(root / "output"),
+            ocr_workers=args.workers, llm_workers=2, log=lambda message: None, metrics_dir=root / "metrics",
+        )
+        try:
+            summary = runner.run()
+            stages = runner.metrics.summary()
+            checks.append(("todas as páginas processadas", summary.get("processed") == args.pages and not summary.get("failed")))
+            checks.append(("documento exportado", bool(exporter.documents.get("lote.docx", "").strip())))
+            checks.append((f"análises simultâneas ({transport.max_in_flight})", transport.max_in_flight > 1))
+            for stage in ("ocr.submit", "ocr.poll"):
+                count = stages.get(stage, {}).get("count", 0)
+                checks.append((f"métricas {stage} ({count})", count == args.pages))
+
+            requests = transport.requests
+            summary = runner.run(force_ocr=True)
+            checks.append(("segunda rodada sem requisições (cache)", transport.requests == requests and not summary.get("failed")))
+        finally:
+            runner.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    for name, ok in checks:
+        print(f"{'ok' if ok else 'FALHOU':<7} {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())